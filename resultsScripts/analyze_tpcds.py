@@ -6,162 +6,255 @@ Usage:
     python3 analyze_tpcds.py [--input tpcds_results.csv]
 """
 
-import csv
 import argparse
-import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import sys
-
-def load_data(filepath):
-    """Load CSV data into list of dicts."""
-    data = []
-    with open(filepath, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Handle both old and new CSV formats
-            if 'rl_predicted' in row:
-                # New format with both predictions
-                data.append({
-                    'query_num': int(row['query_num']),
-                    'operator': row['operator'],
-                    'actual': int(row['actual']),
-                    'rl_predicted': int(row['rl_predicted']),
-                    'duck_predicted': int(row['duck_predicted']),
-                    'rl_q_error': float(row['rl_q_error']),
-                    'duck_q_error': float(row['duck_q_error']),
-                    'trees': int(row['trees']),
-                    'timestamp': row['timestamp']
-                })
-            else:
-                # Old format (backwards compatibility)
-                data.append({
-                    'query_num': int(row['query_num']),
-                    'operator': row['operator'],
-                    'actual': int(row['actual']),
-                    'rl_predicted': int(row['predicted']),
-                    'duck_predicted': 0,  # Not available
-                    'rl_q_error': float(row['q_error']),
-                    'duck_q_error': 0.0,  # Not available
-                    'trees': int(row['trees']),
-                    'timestamp': row['timestamp']
-                })
-    return data
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+try:
+    import bottleneck as bn
+except ImportError:  # Optional: only used to speed up rolling_median
+    bn = None
+
+# Column dtypes of the results CSV written by run_tpcds_benchmark.py.
+# Q-errors stay float64: they reach ~1e18, beyond float32's 24-bit mantissa.
+CSV_DTYPES = {
+    'query_num': 'int32',
+    'operator': 'category',
+    'actual': 'int64',
+    'rl_predicted': 'int64',
+    'duck_predicted': 'int64',
+    'rl_q_error': 'float64',
+    'duck_q_error': 'float64',
+    'trees': 'int32',
+    'timestamp': 'str',
+}
+
+# Old CSV format only logged the RL prediction
+LEGACY_DTYPES = {
+    'query_num': 'int32',
+    'operator': 'category',
+    'actual': 'int64',
+    'predicted': 'int64',
+    'q_error': 'float64',
+    'trees': 'int32',
+    'timestamp': 'str',
+}
+
+# Q-error distribution buckets: [lo, hi) ranges, the last one open-ended
+BUCKET_LABELS = [
+    '1.0-2.0 (excellent)',
+    '2.0-5.0 (good)',
+    '5.0-10.0 (acceptable)',
+    '10.0-100.0 (poor)',
+    '100.0+ (terrible)',
+]
+BUCKET_EDGES = [1.0, 2.0, 5.0, 10.0, 100.0, np.inf]
+
+# Rendering defaults for every figure; set at import so worker processes get them too
+matplotlib.rcParams.update({
+    'savefig.dpi': 150,
+    'path.simplify': True,
+    # Draw long lines (moving averages, rolling medians) in 10k-vertex pieces
+    'agg.path.chunksize': 10000,
+})
+
+def read_chunks(filepath, engine='c', chunksize=None):
+    """Yield the CSV as typed DataFrames of at most chunksize rows (one frame if None)."""
+    header = pd.read_csv(filepath, nrows=0).columns
+    legacy = 'rl_predicted' not in header
+    dtypes = LEGACY_DTYPES if legacy else CSV_DTYPES
+    reader = pd.read_csv(filepath, usecols=list(dtypes), dtype=dtypes, engine=engine, chunksize=chunksize)
+    for chunk in (reader if chunksize else [reader]):
+        if legacy:
+            # Old format (backwards compatibility)
+            chunk = chunk.rename(columns={'predicted': 'rl_predicted', 'q_error': 'rl_q_error'})
+            chunk['duck_predicted'] = np.zeros(len(chunk), dtype=np.int64)  # Not available
+            chunk['duck_q_error'] = np.zeros(len(chunk), dtype=np.float64)  # Not available
+        yield chunk[list(CSV_DTYPES)]
+
+def load_data(filepath, engine='c', chunksize=None):
+    """Load CSV data into a DataFrame with one typed column per field.
+
+    With chunksize set, the file is parsed in pieces of that many rows so the
+    parser's working set stays bounded, then concatenated once.
+    """
+    chunks = read_chunks(filepath, engine, chunksize)
+    if not chunksize:
+        return next(chunks)
+    df = pd.concat(chunks, ignore_index=True)
+    # Chunks can see different operator subsets, which degrades the concat to object dtype
+    df['operator'] = df['operator'].astype('category')
+    return df
+
+class QErrorSketch:
+    """Constant-memory summary of a Q-error stream, updated one chunk at a time.
+
+    Count, mean, variance, min and max are exact (chunk moments are merged with
+    Chan's parallel update). Quantiles come from a log-spaced histogram with
+    500 bins per decade, so they are accurate to about 0.5%. Values below 1
+    (legacy CSVs store a missing Q-error as 0) are counted outside the histogram,
+    and missing or non-finite values are skipped and counted in nonfinite.
+    """
+
+    LOG_EDGES = np.logspace(0, 20, 20 * 500 + 1)
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.hist = np.zeros(len(self.LOG_EDGES) - 1, dtype=np.int64)
+        self.below_one = 0
+        self.below_one_max = -np.inf
+        self.nonfinite = 0
+        self.buckets = np.zeros(len(BUCKET_EDGES) - 1, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        if not finite.all():
+            self.nonfinite += int(len(values) - finite.sum())
+            values = values[finite]
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = np.dot(values - mean, values - mean)
+        delta = mean - self.mean
+        total = self.count + n
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        below = values < self.LOG_EDGES[0]
+        if below.any():
+            self.below_one += int(below.sum())
+            self.below_one_max = max(self.below_one_max, values[below].max())
+        clipped = np.minimum(values[~below], self.LOG_EDGES[-1])
+        self.hist += np.histogram(clipped, bins=self.LOG_EDGES)[0]
+        self.buckets += np.histogram(values, bins=BUCKET_EDGES)[0]
+
+    def std(self):
+        return np.sqrt(self.m2 / self.count) if self.count else np.nan
+
+    def percentile(self, p):
+        """Approximate percentile: geometric midpoint of the bin holding rank p."""
+        if not self.count:
+            return np.nan
+        rank = p / 100.0 * (self.count - 1)
+        if rank < self.below_one:
+            # Ranks among the sub-1 values report the largest of them (numpy float,
+            # so the improvement ratios divide by a zero median the way the in-memory path does)
+            return np.float64(self.below_one_max)
+        i = np.searchsorted(np.cumsum(self.hist), rank - self.below_one, side='right')
+        return float(np.sqrt(self.LOG_EDGES[i] * self.LOG_EDGES[i + 1]))
 
 def moving_average(data, window=100):
-    """Calculate moving average."""
+    """Calculate moving average over each full window."""
     if len(data) < window:
         window = max(1, len(data) // 2)
-    return np.convolve(data, np.ones(window)/window, mode='valid')
-
-def main():
-    parser = argparse.ArgumentParser(description='Analyze TPC-DS benchmark results')
-    parser.add_argument('--input', default='tpcds_results.csv', help='Input CSV file')
-    args = parser.parse_args()
-
-    print(f"Loading data from {args.input}...")
-    data = load_data(args.input)
-
-    if not data:
-        print("No data found!")
-        return 1
-
-    print(f"Loaded {len(data)} data points")
-    print(f"Queries: {min(d['query_num'] for d in data)} to {max(d['query_num'] for d in data)}")
-    print(f"Trees: {min(d['trees'] for d in data)} to {max(d['trees'] for d in data)}")
-    print()
-
-    # Basic statistics - RL vs DuckDB
-    rl_q_errors = [d['rl_q_error'] for d in data]
-    duck_q_errors = [d['duck_q_error'] for d in data]
-
-    print("=" * 80)
-    print("Q-ERROR STATISTICS: RL MODEL vs DUCKDB BASELINE")
-    print("=" * 80)
-    print(f"{'Metric':<25} {'RL Model':<15} {'DuckDB':<15} {'Improvement':<15}")
-    print("-" * 80)
-    print(f"{'Mean Q-error':<25} {np.mean(rl_q_errors):<15.2f} {np.mean(duck_q_errors):<15.2f} {((np.mean(duck_q_errors) - np.mean(rl_q_errors)) / np.mean(duck_q_errors) * 100):>+14.1f}%")
-    print(f"{'Median Q-error':<25} {np.median(rl_q_errors):<15.2f} {np.median(duck_q_errors):<15.2f} {((np.median(duck_q_errors) - np.median(rl_q_errors)) / np.median(duck_q_errors) * 100):>+14.1f}%")
-    print(f"{'Std Dev':<25} {np.std(rl_q_errors):<15.2f} {np.std(duck_q_errors):<15.2f}")
-    print(f"{'Min Q-error':<25} {np.min(rl_q_errors):<15.2f} {np.min(duck_q_errors):<15.2f}")
-    print(f"{'Max Q-error':<25} {np.max(rl_q_errors):<15.2f} {np.max(duck_q_errors):<15.2f}")
-    print(f"{'95th percentile':<25} {np.percentile(rl_q_errors, 95):<15.2f} {np.percentile(duck_q_errors, 95):<15.2f}")
-    print(f"{'99th percentile':<25} {np.percentile(rl_q_errors, 99):<15.2f} {np.percentile(duck_q_errors, 99):<15.2f}")
-    print()
-
-    # Distribution buckets for RL Model
-    rl_buckets = {
-        '1.0-2.0 (excellent)': sum(1 for q in rl_q_errors if 1.0 <= q < 2.0),
-        '2.0-5.0 (good)': sum(1 for q in rl_q_errors if 2.0 <= q < 5.0),
-        '5.0-10.0 (acceptable)': sum(1 for q in rl_q_errors if 5.0 <= q < 10.0),
-        '10.0-100.0 (poor)': sum(1 for q in rl_q_errors if 10.0 <= q < 100.0),
-        '100.0+ (terrible)': sum(1 for q in rl_q_errors if q >= 100.0),
-    }
-    duck_buckets = {
-        '1.0-2.0 (excellent)': sum(1 for q in duck_q_errors if 1.0 <= q < 2.0),
-        '2.0-5.0 (good)': sum(1 for q in duck_q_errors if 2.0 <= q < 5.0),
-        '5.0-10.0 (acceptable)': sum(1 for q in duck_q_errors if 5.0 <= q < 10.0),
-        '10.0-100.0 (poor)': sum(1 for q in duck_q_errors if 10.0 <= q < 100.0),
-        '100.0+ (terrible)': sum(1 for q in duck_q_errors if q >= 100.0),
-    }
-    print("Q-ERROR DISTRIBUTION")
-    print("=" * 80)
-    print(f"{'Range':<30} {'RL Model':>12} {'DuckDB':>12}")
-    print("-" * 80)
-    for bucket in rl_buckets.keys():
-        rl_count = rl_buckets[bucket]
-        duck_count = duck_buckets[bucket]
-        rl_pct = rl_count / len(rl_q_errors) * 100
-        duck_pct = duck_count / len(duck_q_errors) * 100
-        print(f"{bucket:30s} {rl_count:6d} ({rl_pct:4.1f}%)  {duck_count:6d} ({duck_pct:4.1f}%)")
-    print()
-
-    # Per-operator statistics
-    rl_by_operator = defaultdict(list)
-    duck_by_operator = defaultdict(list)
-    for d in data:
-        rl_by_operator[d['operator']].append(d['rl_q_error'])
-        duck_by_operator[d['operator']].append(d['duck_q_error'])
-
-    print("PER-OPERATOR Q-ERROR (RL Model)")
-    print("=" * 80)
-    print(f"{'Operator':<20} {'Count':>8} {'Mean':>12} {'Median':>12} {'Min':>12} {'Max':>12}")
-    print("-" * 80)
-    for op in sorted(rl_by_operator.keys()):
-        qerrs = rl_by_operator[op]
-        print(f"{op:<20} {len(qerrs):>8} {np.mean(qerrs):>12.2f} {np.median(qerrs):>12.2f} "
-              f"{np.min(qerrs):>12.2f} {np.max(qerrs):>12.2f}")
-    print()
-
-    # Temporal analysis (beginning vs end) - RL Model
-    third = len(data) // 3
-    rl_beginning = [d['rl_q_error'] for d in data[:third]]
-    rl_middle = [d['rl_q_error'] for d in data[third:2*third]]
-    rl_end = [d['rl_q_error'] for d in data[2*third:]]
-
-    print("TEMPORAL ANALYSIS - RL MODEL (Split into thirds)")
-    print("=" * 80)
-    print(f"{'Period':<20} {'Count':>8} {'Mean':>12} {'Median':>12}")
-    print("-" * 80)
-    print(f"{'Beginning':<20} {len(rl_beginning):>8} {np.mean(rl_beginning):>12.2f} {np.median(rl_beginning):>12.2f}")
-    print(f"{'Middle':<20} {len(rl_middle):>8} {np.mean(rl_middle):>12.2f} {np.median(rl_middle):>12.2f}")
-    print(f"{'End':<20} {len(rl_end):>8} {np.mean(rl_end):>12.2f} {np.median(rl_end):>12.2f}")
-
-    rl_improvement = ((np.median(rl_beginning) - np.median(rl_end)) / np.median(rl_beginning)) * 100
-    print(f"\nRL Model improvement from beginning to end: {rl_improvement:+.1f}%")
-    print()
-
-    # Create visualizations
-    print("Generating visualizations...")
-
-    # 1. Q-error over time (RL vs DuckDB comparison)
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
+    # Box filter in O(N) via per-block prefix/suffix sums (van Herk/Gil-Werman).
+    # A global cumsum would be cheaper but Q-errors span ~20 orders of magnitude,
+    # and subtracting running totals would wipe out every window after an outlier.
+    n = len(data)
+    padded = np.zeros(-(-n // window) * window)
+    padded[:n] = data
+    blocks = padded.reshape(-1, window)
+    prefix = np.cumsum(blocks, axis=1).ravel()
+    suffix = np.cumsum(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    starts = np.arange(n - window + 1)
+    # A window starting on a block boundary is exactly that block's suffix sum
+    sums = suffix[starts] + np.where(starts % window == 0, 0.0, prefix[starts + window - 1])
+    return sums / window
+
+def rolling_median(data, window):
+    """Calculate rolling median over each full window."""
+    data = np.asarray(data, dtype=np.float64)
+    if len(data) < window:
+        return np.empty(0)
+    if bn is not None:
+        # Double-heap moving median in C; the first window-1 entries are partial windows
+        return bn.move_median(data, window=window)[window-1:]
+    result = []
+    for i in range(len(data) - window + 1):
+        result.append(np.median(data[i:i+window]))
+    return np.array(result)
+
+def sorted_percentile(sorted_data, p):
+    """np.percentile (linear interpolation) on an already-sorted array in O(1)."""
+    k = (len(sorted_data) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_data) - 1)
+    return sorted_data[lo] + (sorted_data[hi] - sorted_data[lo]) * (k - lo)
+
+def box_stats(sorted_data, label):
+    """Boxplot stats for ax.bxp from an already-sorted array (matplotlib's whis=1.5 rule)."""
+    q1, med, q3 = (sorted_percentile(sorted_data, p) for p in (25, 50, 75))
+    iqr = q3 - q1
+    # Whiskers reach the most extreme points within 1.5 IQR of the box
+    lo = np.searchsorted(sorted_data, q1 - 1.5 * iqr, side='left')
+    whislo = sorted_data[lo] if lo < len(sorted_data) and sorted_data[lo] <= q1 else q1
+    hi = np.searchsorted(sorted_data, q3 + 1.5 * iqr, side='right') - 1
+    whishi = sorted_data[hi] if hi >= 0 and sorted_data[hi] >= q3 else q3
+    fliers = np.concatenate([
+        sorted_data[:np.searchsorted(sorted_data, whislo, side='left')],
+        sorted_data[np.searchsorted(sorted_data, whishi, side='right'):],
+    ])
+    return {'label': label, 'q1': q1, 'med': med, 'q3': q3,
+            'whislo': whislo, 'whishi': whishi, 'fliers': fliers}
+
+def linear_fit(x, y):
+    """Closed-form least-squares slope and intercept of y = slope * x + intercept."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_mean, y_mean = x.mean(), y.mean()
+    dx = x - x_mean
+    denom = np.dot(dx, dx)
+    slope = np.dot(dx, y - y_mean) / denom if denom > 0 else 0.0
+    return slope, y_mean - slope * x_mean
+
+# Scatter panels draw at most this many points; past that, markers only overdraw
+MAX_SCATTER_POINTS = 50_000
+
+def scatter_sample(n, max_points=MAX_SCATTER_POINTS):
+    """Index selecting a fixed random subset of at most max_points out of n samples."""
+    if n <= max_points:
+        return slice(None)
+    return np.sort(np.random.default_rng(0).choice(n, max_points, replace=False))
+
+def new_figure(figsize):
+    """Create a Figure on its own Agg canvas, bypassing the pyplot state machine."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def save_figure(fig, filename):
+    """Lay out and write a figure to PNG, returning the filename."""
+    fig.tight_layout()
+    fig.savefig(filename)
+    return filename
+
+def plot_qerror_over_time(plot_data):
+    """1. Q-error over time (RL vs DuckDB comparison)."""
+    rl_q_errors = plot_data['rl_q_errors']
+    duck_q_errors = plot_data['duck_q_errors']
+    fig = new_figure(figsize=(14, 10))
+    ax1, ax2 = fig.subplots(2, 1)
 
     # Raw scatter (log scale) - RL vs DuckDB
-    indices = range(len(rl_q_errors))
-    ax1.scatter(indices, rl_q_errors, alpha=0.3, s=5, c='blue', label='RL Model')
-    ax1.scatter(indices, duck_q_errors, alpha=0.3, s=5, c='red', label='DuckDB Baseline')
+    sample = scatter_sample(len(rl_q_errors))
+    indices = plot_data['sample_idx'][sample]
+    ax1.scatter(indices, rl_q_errors[sample], alpha=0.3, s=5, c='blue', label='RL Model', rasterized=True)
+    ax1.scatter(indices, duck_q_errors[sample], alpha=0.3, s=5, c='red', label='DuckDB Baseline', rasterized=True)
     ax1.set_yscale('log')
     ax1.set_xlabel('Sample Index (Operator Number)', fontsize=12)
     ax1.set_ylabel('Q-error (log scale)', fontsize=12)
@@ -176,8 +269,9 @@ def main():
     if len(rl_q_errors) > window:
         rl_ma = moving_average(rl_q_errors, window)
         duck_ma = moving_average(duck_q_errors, window)
-        ax2.plot(range(window-1, len(rl_q_errors)), rl_ma, 'b-', linewidth=2, label=f'RL Model (MA window={window})')
-        ax2.plot(range(window-1, len(duck_q_errors)), duck_ma, 'r-', linewidth=2, label=f'DuckDB (MA window={window})')
+        ma_x = plot_data['sample_idx'][window-1:]
+        ax2.plot(ma_x, rl_ma, 'b-', linewidth=2, label=f'RL Model (MA window={window})')
+        ax2.plot(ma_x, duck_ma, 'r-', linewidth=2, label=f'DuckDB (MA window={window})')
         ax2.set_yscale('log')
         ax2.set_xlabel('Sample Index (Operator Number)', fontsize=12)
         ax2.set_ylabel('Q-error (log scale)', fontsize=12)
@@ -187,27 +281,28 @@ def main():
         ax2.axhline(y=10.0, color='orange', linestyle='--', alpha=0.5, label='Threshold')
         ax2.legend()
 
-    plt.tight_layout()
-    plt.savefig('tpcds_qerror_over_time.png', dpi=150)
-    print("  ✓ Saved: tpcds_qerror_over_time.png")
-    plt.close()
+    return save_figure(fig, 'tpcds_qerror_over_time.png')
 
-    # 2. Tree growth over time
-    fig, ax = plt.subplots(figsize=(12, 6))
-    trees = [d['trees'] for d in data]
-    ax.plot(range(len(trees)), trees, 'g-', linewidth=2)
+def plot_tree_growth(plot_data):
+    """2. Tree growth over time."""
+    trees = plot_data['trees']
+    fig = new_figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.plot(plot_data['sample_idx'], trees, 'g-', linewidth=2)
     ax.set_xlabel('Sample Index (Operator Number)', fontsize=12)
     ax.set_ylabel('Number of Trees', fontsize=12)
     ax.set_title('Model Size Growth (Tree Count Over Time)', fontsize=14, fontweight='bold')
     ax.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('tpcds_tree_growth.png', dpi=150)
-    print("  ✓ Saved: tpcds_tree_growth.png")
-    plt.close()
-
-    # 3. Q-error vs Trees (correlation) - RL Model
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.scatter(trees, rl_q_errors, alpha=0.4, s=20, c='purple')
+    return save_figure(fig, 'tpcds_tree_growth.png')
+
+def plot_qerror_vs_trees(plot_data):
+    """3. Q-error vs Trees (correlation) - RL Model."""
+    trees = plot_data['trees']
+    rl_q_errors = plot_data['rl_q_errors']
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sample = scatter_sample(len(trees))
+    ax.scatter(trees[sample], rl_q_errors[sample], alpha=0.4, s=20, c='purple', rasterized=True)
     ax.set_xlabel('Number of Trees', fontsize=12)
     ax.set_ylabel('Q-error (log scale)', fontsize=12)
     ax.set_yscale('log')
@@ -217,26 +312,21 @@ def main():
     # Add trend line
     if len(trees) > 10:
         # Use log of Q-error for trend
-        log_qerr = np.log10(rl_q_errors)
-        z = np.polyfit(trees, log_qerr, 1)
-        p = np.poly1d(z)
-        trend_x = np.linspace(min(trees), max(trees), 100)
-        trend_y = 10 ** p(trend_x)
-        ax.plot(trend_x, trend_y, "r--", linewidth=2, label=f'Trend (slope={z[0]:.6f})')
+        slope, intercept = linear_fit(trees, plot_data['log_rl'])
+        trend_x = np.linspace(trees.min(), trees.max(), 100)
+        trend_y = 10 ** (slope * trend_x + intercept)
+        ax.plot(trend_x, trend_y, "r--", linewidth=2, label=f'Trend (slope={slope:.6f})')
         ax.legend()
 
-    plt.tight_layout()
-    plt.savefig('tpcds_qerror_vs_trees.png', dpi=150)
-    print("  ✓ Saved: tpcds_qerror_vs_trees.png")
-    plt.close()
-
-    # 4. Per-operator Q-error boxplot (RL Model)
-    fig, ax = plt.subplots(figsize=(14, 8))
+    return save_figure(fig, 'tpcds_qerror_vs_trees.png')
 
-    operators = sorted(rl_by_operator.keys(), key=lambda x: np.median(rl_by_operator[x]))
-    data_for_box = [rl_by_operator[op] for op in operators]
+def plot_qerror_by_operator(plot_data):
+    """4. Per-operator Q-error boxplot (RL Model)."""
+    operators = plot_data['box_operators']
+    fig = new_figure(figsize=(14, 8))
+    ax = fig.subplots()
 
-    bp = ax.boxplot(data_for_box, labels=operators, patch_artist=True)
+    bp = ax.bxp(plot_data['box_stats'], patch_artist=True)
     for patch in bp['boxes']:
         patch.set_facecolor('lightblue')
 
@@ -245,42 +335,34 @@ def main():
     ax.set_ylabel('Q-error (log scale)', fontsize=12)
     ax.set_title('RL Model Q-error Distribution by Operator Type', fontsize=14, fontweight='bold')
     ax.grid(True, alpha=0.3, axis='y')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig('tpcds_qerror_by_operator.png', dpi=150)
-    print("  ✓ Saved: tpcds_qerror_by_operator.png")
-    plt.close()
-
-    # 5. Per-query average Q-error (RL Model)
-    by_query = defaultdict(list)
-    for d in data:
-        by_query[d['query_num']].append(d['rl_q_error'])
-
-    query_nums = sorted(by_query.keys())
-    query_avgs = [np.mean(by_query[q]) for q in query_nums]
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.bar(query_nums, query_avgs, color='steelblue', alpha=0.7)
+    ax.set_xticklabels(operators, rotation=45, ha='right')
+    return save_figure(fig, 'tpcds_qerror_by_operator.png')
+
+def plot_qerror_by_query(plot_data):
+    """5. Per-query average Q-error (RL Model)."""
+    fig = new_figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.bar(plot_data['query_nums'], plot_data['query_avgs'], color='steelblue', alpha=0.7)
     ax.set_xlabel('Query Number', fontsize=12)
     ax.set_ylabel('Average Q-error (log scale)', fontsize=12)
     ax.set_yscale('log')
     ax.set_title('RL Model Average Q-error per Query', fontsize=14, fontweight='bold')
     ax.grid(True, alpha=0.3, axis='y')
-    plt.tight_layout()
-    plt.savefig('tpcds_qerror_by_query.png', dpi=150)
-    print("  ✓ Saved: tpcds_qerror_by_query.png")
-    plt.close()
-
-    # 6. Prediction accuracy scatter (actual vs predicted) - RL Model
-    fig, ax = plt.subplots(figsize=(10, 10))
-    actual_vals = [d['actual'] for d in data]
-    rl_pred_vals = [d['rl_predicted'] for d in data]
+    return save_figure(fig, 'tpcds_qerror_by_query.png')
 
-    ax.scatter(actual_vals, rl_pred_vals, alpha=0.4, s=20, c='blue')
+def plot_actual_vs_predicted(plot_data):
+    """6. Prediction accuracy scatter (actual vs predicted) - RL Model."""
+    actual_vals = plot_data['actual_vals']
+    rl_pred_vals = plot_data['rl_pred_vals']
+    fig = new_figure(figsize=(10, 10))
+    ax = fig.subplots()
+    sample = scatter_sample(len(actual_vals))
+    ax.scatter(actual_vals[sample], rl_pred_vals[sample], alpha=0.4, s=20, c='blue', rasterized=True)
 
     # Perfect prediction line
-    min_val = min(min(actual_vals), min(rl_pred_vals))
-    max_val = max(max(actual_vals), max(rl_pred_vals))
+    # Python ints, so the 2x/10x band endpoints cannot overflow int64
+    min_val = int(min(actual_vals.min(), rl_pred_vals.min()))
+    max_val = int(max(actual_vals.max(), rl_pred_vals.max()))
     ax.plot([min_val, max_val], [min_val, max_val], 'r--', linewidth=2, label='Perfect Prediction')
 
     # 2x and 10x error bands
@@ -296,20 +378,18 @@ def main():
     ax.set_title('Prediction Accuracy: Actual vs Predicted Cardinality', fontsize=14, fontweight='bold')
     ax.legend()
     ax.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.savefig('tpcds_actual_vs_predicted.png', dpi=150)
-    print("  ✓ Saved: tpcds_actual_vs_predicted.png")
-    plt.close()
-
-    # 7. Q-error by query number (simple scatter, no averaging) - RL Model
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
-
-    # Extract query numbers and Q-errors
-    query_nums_for_plot = [d['query_num'] for d in data]
-    rl_q_errs = [d['rl_q_error'] for d in data]
-
-    # Linear scale
-    ax1.scatter(query_nums_for_plot, rl_q_errs, alpha=0.5, s=15, c='blue')
+    return save_figure(fig, 'tpcds_actual_vs_predicted.png')
+
+def plot_qerror_by_query_scatter(plot_data):
+    """7. Q-error by query number (simple scatter, no averaging) - RL Model."""
+    query_num_vals = plot_data['query_num_vals']
+    rl_q_errors = plot_data['rl_q_errors']
+    fig = new_figure(figsize=(14, 10))
+    ax1, ax2 = fig.subplots(2, 1)
+
+    # Linear scale (scatters are subsampled; the trend fit below uses every point)
+    sample = scatter_sample(len(query_num_vals))
+    ax1.scatter(query_num_vals[sample], rl_q_errors[sample], alpha=0.5, s=15, c='blue', rasterized=True)
     ax1.set_xlabel('Query Number', fontsize=12)
     ax1.set_ylabel('Q-error (linear scale)', fontsize=12)
     ax1.set_title('RL Model Q-error Over Query Execution (Linear Scale)', fontsize=14, fontweight='bold')
@@ -319,7 +399,8 @@ def main():
     ax1.legend()
 
     # Log scale with trend line
-    ax2.scatter(query_nums_for_plot, rl_q_errs, alpha=0.5, s=15, c='darkblue', label='Q-error values')
+    ax2.scatter(query_num_vals[sample], rl_q_errors[sample], alpha=0.5, s=15, c='darkblue', label='Q-error values',
+                rasterized=True)
     ax2.set_xlabel('Query Number', fontsize=12)
     ax2.set_ylabel('Q-error (log scale)', fontsize=12)
     ax2.set_yscale('log')
@@ -328,47 +409,38 @@ def main():
     ax2.axhline(y=10.0, color='orange', linestyle='--', linewidth=1, label='Threshold (Q-error = 10.0)')
 
     # Add trend line (fit in log space)
-    log_qerr = np.log10(rl_q_errs)
-    z = np.polyfit(query_nums_for_plot, log_qerr, 1)  # Linear fit on log(Q-error)
-    p = np.poly1d(z)
+    slope, intercept = linear_fit(query_num_vals, plot_data['log_rl'])  # Linear fit on log(Q-error)
 
     # Generate trend line
-    trend_x = np.linspace(min(query_nums_for_plot), max(query_nums_for_plot), 100)
-    trend_y = 10 ** p(trend_x)  # Convert back from log space
+    trend_x = np.linspace(query_num_vals.min(), query_num_vals.max(), 100)
+    trend_y = 10 ** (slope * trend_x + intercept)  # Convert back from log space
 
-    slope_percent = (z[0] / p(query_nums_for_plot[0])) * 100  # Slope as percentage
-    trend_label = f'Trend (slope={z[0]:.6f}, {"↓ improving" if z[0] < 0 else "↑ worsening"})'
+    trend_label = f'Trend (slope={slope:.6f}, {"↓ improving" if slope < 0 else "↑ worsening"})'
     ax2.plot(trend_x, trend_y, 'r-', linewidth=3, label=trend_label, alpha=0.8)
 
     ax2.grid(True, alpha=0.3)
     ax2.legend(loc='upper right')
 
-    plt.tight_layout()
-    plt.savefig('tpcds_qerror_by_query_scatter.png', dpi=150)
-    print("  ✓ Saved: tpcds_qerror_by_query_scatter.png")
-    plt.close()
+    return save_figure(fig, 'tpcds_qerror_by_query_scatter.png')
 
-    # 8. Smooth curve comparison - CLEAN VERSION (using rolling median + clipping)
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
+def plot_smooth_comparison(plot_data):
+    """8. Smooth curve comparison - CLEAN VERSION (using rolling median + clipping)."""
+    rl_q_errors = plot_data['rl_q_errors']
+    duck_q_errors = plot_data['duck_q_errors']
+    fig = new_figure(figsize=(14, 10))
+    ax1, ax2 = fig.subplots(2, 1)
 
     # Use rolling MEDIAN (more robust to outliers than mean)
     window = min(500, len(rl_q_errors) // 5)
     if window < 50:
         window = 50
 
-    def rolling_median(data, window):
-        """Calculate rolling median."""
-        result = []
-        for i in range(len(data) - window + 1):
-            result.append(np.median(data[i:i+window]))
-        return np.array(result)
-
     # Calculate rolling medians
     rl_smooth = rolling_median(rl_q_errors, window)
     duck_smooth = rolling_median(duck_q_errors, window)
 
     # X-axis (operator index) - must match length of rl_smooth
-    x_smooth = np.arange(len(rl_smooth))
+    x_smooth = plot_data['sample_idx'][:len(rl_smooth)]
 
     # Plot 1: Clipped view (focus on useful range)
     ax1.plot(x_smooth, rl_smooth, 'b-', linewidth=3, label='RL Model', alpha=0.9)
@@ -389,8 +461,10 @@ def main():
     ax1.legend(fontsize=11, loc='upper right')
 
     # Add statistics text box
-    stats_text = f"Median Q-error:\nRL: {np.median(rl_q_errors):.2f}\nDuckDB: {np.median(duck_q_errors):.2f}\n\n"
-    stats_text += f"RL is {((np.median(duck_q_errors) - np.median(rl_q_errors)) / np.median(duck_q_errors) * 100):.1f}% better"
+    rl_median = plot_data['rl_median']
+    duck_median = plot_data['duck_median']
+    stats_text = f"Median Q-error:\nRL: {rl_median:.2f}\nDuckDB: {duck_median:.2f}\n\n"
+    stats_text += f"RL is {((duck_median - rl_median) / duck_median * 100):.1f}% better"
     ax1.text(0.02, 0.98, stats_text, transform=ax1.transAxes,
             fontsize=10, verticalalignment='top',
             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.9))
@@ -409,27 +483,17 @@ def main():
     ax2.grid(True, alpha=0.3)
     ax2.legend(fontsize=11, loc='upper right')
 
-    plt.tight_layout()
-    plt.savefig('tpcds_smooth_comparison.png', dpi=150)
-    print("  ✓ Saved: tpcds_smooth_comparison.png")
-    plt.close()
+    return save_figure(fig, 'tpcds_smooth_comparison.png')
 
-    # 9. Direct RL vs DuckDB comparison plot
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+def plot_rl_vs_duckdb_comparison(plot_data):
+    """9. Direct RL vs DuckDB comparison plot."""
+    fig = new_figure(figsize=(16, 12))
+    (ax1, ax2), (ax3, ax4) = fig.subplots(2, 2)
 
     # Top left: Median Q-error by query (RL vs DuckDB)
-    by_query_rl = defaultdict(list)
-    by_query_duck = defaultdict(list)
-    for d in data:
-        by_query_rl[d['query_num']].append(d['rl_q_error'])
-        by_query_duck[d['query_num']].append(d['duck_q_error'])
-
-    query_nums_comp = sorted(by_query_rl.keys())
-    rl_medians = [np.median(by_query_rl[q]) for q in query_nums_comp]
-    duck_medians = [np.median(by_query_duck[q]) for q in query_nums_comp]
-
-    ax1.plot(query_nums_comp, rl_medians, 'b-', linewidth=2, label='RL Model', alpha=0.8)
-    ax1.plot(query_nums_comp, duck_medians, 'r-', linewidth=2, label='DuckDB Baseline', alpha=0.8)
+    query_nums_comp = plot_data['query_nums']
+    ax1.plot(query_nums_comp, plot_data['query_rl_medians'], 'b-', linewidth=2, label='RL Model', alpha=0.8)
+    ax1.plot(query_nums_comp, plot_data['query_duck_medians'], 'r-', linewidth=2, label='DuckDB Baseline', alpha=0.8)
     ax1.set_xlabel('Query Number', fontsize=11)
     ax1.set_ylabel('Median Q-error (log scale)', fontsize=11)
     ax1.set_yscale('log')
@@ -438,8 +502,8 @@ def main():
     ax1.grid(True, alpha=0.3)
 
     # Top right: CDF comparison
-    rl_sorted = np.sort(rl_q_errors)
-    duck_sorted = np.sort(duck_q_errors)
+    rl_sorted = plot_data['rl_sorted']
+    duck_sorted = plot_data['duck_sorted']
     rl_cdf = np.arange(1, len(rl_sorted) + 1) / len(rl_sorted)
     duck_cdf = np.arange(1, len(duck_sorted) + 1) / len(duck_sorted)
 
@@ -455,9 +519,9 @@ def main():
     ax2.grid(True, alpha=0.3)
 
     # Bottom left: Per-operator median comparison
-    operators_comp = sorted(rl_by_operator.keys())
-    rl_op_medians = [np.median(rl_by_operator[op]) for op in operators_comp]
-    duck_op_medians = [np.median(duck_by_operator[op]) for op in operators_comp]
+    operators_comp = plot_data['operators']
+    rl_op_medians = plot_data['op_rl_medians']
+    duck_op_medians = plot_data['op_duck_medians']
 
     x_pos = np.arange(len(operators_comp))
     width = 0.35
@@ -475,9 +539,7 @@ def main():
 
     # Bottom right: Improvement factor
     improvement_factors = []
-    for op in operators_comp:
-        rl_med = np.median(rl_by_operator[op])
-        duck_med = np.median(duck_by_operator[op])
+    for rl_med, duck_med in zip(rl_op_medians, duck_op_medians):
         if duck_med > 0:
             improvement = (duck_med - rl_med) / duck_med * 100
             improvement_factors.append(improvement)
@@ -492,10 +554,239 @@ def main():
     ax4.axvline(x=0, color='black', linestyle='-', linewidth=1)
     ax4.grid(True, alpha=0.3, axis='x')
 
-    plt.tight_layout()
-    plt.savefig('tpcds_rl_vs_duckdb_comparison.png', dpi=150)
-    print("  ✓ Saved: tpcds_rl_vs_duckdb_comparison.png")
-    plt.close()
+    return save_figure(fig, 'tpcds_rl_vs_duckdb_comparison.png')
+
+# The nine figures are independent, so they can be rendered in parallel. Each is
+# listed with the plot_data entries it reads; a worker is sent only those.
+PLOTS = [
+    (plot_qerror_over_time, ['rl_q_errors', 'duck_q_errors', 'sample_idx']),
+    (plot_tree_growth, ['trees', 'sample_idx']),
+    (plot_qerror_vs_trees, ['trees', 'rl_q_errors', 'log_rl']),
+    (plot_qerror_by_operator, ['box_operators', 'box_stats']),
+    (plot_qerror_by_query, ['query_nums', 'query_avgs']),
+    (plot_actual_vs_predicted, ['actual_vals', 'rl_pred_vals']),
+    (plot_qerror_by_query_scatter, ['query_num_vals', 'rl_q_errors', 'log_rl']),
+    (plot_smooth_comparison, ['rl_q_errors', 'duck_q_errors', 'rl_median', 'duck_median', 'sample_idx']),
+    (plot_rl_vs_duckdb_comparison, ['rl_sorted', 'duck_sorted', 'query_nums', 'query_rl_medians',
+                                    'query_duck_medians', 'op_rl_medians', 'op_duck_medians', 'operators']),
+]
+
+# Every worker holds a copy of its plot's arrays, so keep the pool small by default
+DEFAULT_JOBS = min(4, len(PLOTS))
+
+def print_streaming_summary(filepath, engine='c', chunksize=1_000_000):
+    """Print the Q-error summary tables without holding the whole CSV in memory."""
+    rl_stats = QErrorSketch()
+    duck_stats = QErrorSketch()
+    rl_by_operator = defaultdict(QErrorSketch)
+    for chunk in read_chunks(filepath, engine, chunksize):
+        rl_stats.update(chunk['rl_q_error'].to_numpy())
+        duck_stats.update(chunk['duck_q_error'].to_numpy())
+        for op, qerrs in chunk.groupby('operator', observed=True)['rl_q_error']:
+            rl_by_operator[op].update(qerrs.to_numpy())
+
+    if rl_stats.count == 0:
+        print("No data found!")
+        return 1
+
+    print(f"Streamed {rl_stats.count} data points (median/percentiles approximate to ~0.5%)")
+    skipped = rl_stats.nonfinite + duck_stats.nonfinite
+    if skipped:
+        print(f"Skipped {skipped} missing or non-finite Q-errors")
+    print()
+
+    rl_median = rl_stats.percentile(50)
+    duck_median = duck_stats.percentile(50)
+    print("=" * 80)
+    print("Q-ERROR STATISTICS: RL MODEL vs DUCKDB BASELINE")
+    print("=" * 80)
+    print(f"{'Metric':<25} {'RL Model':<15} {'DuckDB':<15} {'Improvement':<15}")
+    print("-" * 80)
+    print(f"{'Mean Q-error':<25} {rl_stats.mean:<15.2f} {duck_stats.mean:<15.2f} {((duck_stats.mean - rl_stats.mean) / duck_stats.mean * 100):>+14.1f}%")
+    print(f"{'Median Q-error':<25} {rl_median:<15.2f} {duck_median:<15.2f} {((duck_median - rl_median) / duck_median * 100):>+14.1f}%")
+    print(f"{'Std Dev':<25} {rl_stats.std():<15.2f} {duck_stats.std():<15.2f}")
+    print(f"{'Min Q-error':<25} {rl_stats.min:<15.2f} {duck_stats.min:<15.2f}")
+    print(f"{'Max Q-error':<25} {rl_stats.max:<15.2f} {duck_stats.max:<15.2f}")
+    print(f"{'95th percentile':<25} {rl_stats.percentile(95):<15.2f} {duck_stats.percentile(95):<15.2f}")
+    print(f"{'99th percentile':<25} {rl_stats.percentile(99):<15.2f} {duck_stats.percentile(99):<15.2f}")
+    print()
+
+    print("Q-ERROR DISTRIBUTION")
+    print("=" * 80)
+    print(f"{'Range':<30} {'RL Model':>12} {'DuckDB':>12}")
+    print("-" * 80)
+    for bucket, rl_count, duck_count in zip(BUCKET_LABELS, rl_stats.buckets, duck_stats.buckets):
+        rl_pct = rl_count / rl_stats.count * 100
+        duck_pct = duck_count / duck_stats.count * 100
+        print(f"{bucket:30s} {rl_count:6d} ({rl_pct:4.1f}%)  {duck_count:6d} ({duck_pct:4.1f}%)")
+    print()
+
+    print("PER-OPERATOR Q-ERROR (RL Model)")
+    print("=" * 80)
+    print(f"{'Operator':<20} {'Count':>8} {'Mean':>12} {'Median':>12} {'Min':>12} {'Max':>12}")
+    print("-" * 80)
+    for op in sorted(rl_by_operator):
+        stats = rl_by_operator[op]
+        print(f"{op:<20} {stats.count:>8} {stats.mean:>12.2f} {stats.percentile(50):>12.2f} "
+              f"{stats.min:>12.2f} {stats.max:>12.2f}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze TPC-DS benchmark results')
+    parser.add_argument('--input', default='tpcds_results.csv', help='Input CSV file')
+    parser.add_argument('--engine', default='c', choices=['c', 'pyarrow'],
+                        help='pandas CSV parser engine (pyarrow is multithreaded)')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f'Worker processes for rendering plots (default: {DEFAULT_JOBS}, 1 = serial)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Parse the CSV in chunks of this many rows to cap parser memory')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Only print summary statistics, accumulated chunk by chunk in constant memory')
+    args = parser.parse_args()
+
+    if args.engine == 'pyarrow' and (args.chunksize or args.streaming):
+        parser.error('--engine pyarrow does not support chunked reading')
+
+    if args.streaming:
+        print(f"Streaming data from {args.input}...")
+        return print_streaming_summary(args.input, args.engine, args.chunksize or 1_000_000)
+
+    print(f"Loading data from {args.input}...")
+    df = load_data(args.input, engine=args.engine, chunksize=args.chunksize)
+
+    if df.empty:
+        print("No data found!")
+        return 1
+
+    # Materialize each column once; every statistic and plot below reuses these arrays
+    query_num_vals = df['query_num'].to_numpy()
+    actual_vals = df['actual'].to_numpy()
+    rl_pred_vals = df['rl_predicted'].to_numpy()
+    rl_q_errors = df['rl_q_error'].to_numpy()
+    duck_q_errors = df['duck_q_error'].to_numpy()
+    trees = df['trees'].to_numpy()
+
+    # Sort once; medians, percentiles, extrema and the CDF panel all index into these
+    rl_sorted = np.sort(rl_q_errors)
+    duck_sorted = np.sort(duck_q_errors)
+    rl_median = sorted_percentile(rl_sorted, 50)
+    duck_median = sorted_percentile(duck_sorted, 50)
+
+    print(f"Loaded {len(df)} data points")
+    print(f"Queries: {query_num_vals.min()} to {query_num_vals.max()}")
+    print(f"Trees: {trees.min()} to {trees.max()}")
+    print()
+
+    # Basic statistics - RL vs DuckDB
+    print("=" * 80)
+    print("Q-ERROR STATISTICS: RL MODEL vs DUCKDB BASELINE")
+    print("=" * 80)
+    print(f"{'Metric':<25} {'RL Model':<15} {'DuckDB':<15} {'Improvement':<15}")
+    print("-" * 80)
+    print(f"{'Mean Q-error':<25} {np.mean(rl_q_errors):<15.2f} {np.mean(duck_q_errors):<15.2f} {((np.mean(duck_q_errors) - np.mean(rl_q_errors)) / np.mean(duck_q_errors) * 100):>+14.1f}%")
+    print(f"{'Median Q-error':<25} {rl_median:<15.2f} {duck_median:<15.2f} {((duck_median - rl_median) / duck_median * 100):>+14.1f}%")
+    print(f"{'Std Dev':<25} {np.std(rl_q_errors):<15.2f} {np.std(duck_q_errors):<15.2f}")
+    print(f"{'Min Q-error':<25} {rl_sorted[0]:<15.2f} {duck_sorted[0]:<15.2f}")
+    print(f"{'Max Q-error':<25} {rl_sorted[-1]:<15.2f} {duck_sorted[-1]:<15.2f}")
+    print(f"{'95th percentile':<25} {sorted_percentile(rl_sorted, 95):<15.2f} {sorted_percentile(duck_sorted, 95):<15.2f}")
+    print(f"{'99th percentile':<25} {sorted_percentile(rl_sorted, 99):<15.2f} {sorted_percentile(duck_sorted, 99):<15.2f}")
+    print()
+
+    # Distribution buckets (RL Model vs DuckDB), one histogram pass per array
+    rl_counts, _ = np.histogram(rl_q_errors, bins=BUCKET_EDGES)
+    duck_counts, _ = np.histogram(duck_q_errors, bins=BUCKET_EDGES)
+
+    print("Q-ERROR DISTRIBUTION")
+    print("=" * 80)
+    print(f"{'Range':<30} {'RL Model':>12} {'DuckDB':>12}")
+    print("-" * 80)
+    for bucket, rl_count, duck_count in zip(BUCKET_LABELS, rl_counts, duck_counts):
+        rl_pct = rl_count / len(rl_q_errors) * 100
+        duck_pct = duck_count / len(duck_q_errors) * 100
+        print(f"{bucket:30s} {rl_count:6d} ({rl_pct:4.1f}%)  {duck_count:6d} ({duck_pct:4.1f}%)")
+    print()
+
+    # Per-operator statistics (groups come back sorted by operator name)
+    by_operator = df.groupby('operator', observed=True)
+    rl_op_stats = by_operator['rl_q_error'].agg(['count', 'mean', 'median', 'min', 'max'])
+
+    print("PER-OPERATOR Q-ERROR (RL Model)")
+    print("=" * 80)
+    print(f"{'Operator':<20} {'Count':>8} {'Mean':>12} {'Median':>12} {'Min':>12} {'Max':>12}")
+    print("-" * 80)
+    for op, count, mean, median, qmin, qmax in rl_op_stats.itertuples(name=None):
+        print(f"{op:<20} {count:>8} {mean:>12.2f} {median:>12.2f} "
+              f"{qmin:>12.2f} {qmax:>12.2f}")
+    print()
+
+    # Temporal analysis (beginning vs end) - RL Model
+    third = len(df) // 3
+    rl_beginning = rl_q_errors[:third]
+    rl_middle = rl_q_errors[third:2*third]
+    rl_end = rl_q_errors[2*third:]
+
+    print("TEMPORAL ANALYSIS - RL MODEL (Split into thirds)")
+    print("=" * 80)
+    print(f"{'Period':<20} {'Count':>8} {'Mean':>12} {'Median':>12}")
+    print("-" * 80)
+    print(f"{'Beginning':<20} {len(rl_beginning):>8} {np.mean(rl_beginning):>12.2f} {np.median(rl_beginning):>12.2f}")
+    print(f"{'Middle':<20} {len(rl_middle):>8} {np.mean(rl_middle):>12.2f} {np.median(rl_middle):>12.2f}")
+    print(f"{'End':<20} {len(rl_end):>8} {np.mean(rl_end):>12.2f} {np.median(rl_end):>12.2f}")
+
+    rl_improvement = ((np.median(rl_beginning) - np.median(rl_end)) / np.median(rl_beginning)) * 100
+    print(f"\nRL Model improvement from beginning to end: {rl_improvement:+.1f}%")
+    print()
+
+    # Create visualizations
+    print("Generating visualizations...")
+
+    # Per-query aggregates (top-left panel of plot 9 and the plot 5 bar chart),
+    # both models in one hash aggregation; groups come back sorted by query number
+    query_stats = df.groupby('query_num').agg(
+        rl_mean=('rl_q_error', 'mean'),
+        rl_median=('rl_q_error', 'median'),
+        duck_median=('duck_q_error', 'median'),
+    )
+
+    # Everything the plot functions need, as plain arrays so it pickles cheaply to workers
+    operators = list(rl_op_stats['median'].sort_values(kind='stable').index)
+    plot_data = {
+        'query_num_vals': query_num_vals,
+        'actual_vals': actual_vals,
+        'rl_pred_vals': rl_pred_vals,
+        'rl_q_errors': rl_q_errors,
+        'duck_q_errors': duck_q_errors,
+        # Both trend lines fit in log space; take the log once
+        'log_rl': np.log10(rl_q_errors),
+        'rl_sorted': rl_sorted,
+        'duck_sorted': duck_sorted,
+        'rl_median': rl_median,
+        'duck_median': duck_median,
+        'trees': trees,
+        # Shared sample-index x axis; plots slice it instead of building their own
+        'sample_idx': np.arange(len(df), dtype=np.int32),
+        'box_operators': operators,
+        # Precomputed box stats, so matplotlib skips its own per-box percentiles
+        'box_stats': [box_stats(np.sort(by_operator['rl_q_error'].get_group(op).to_numpy()), op)
+                      for op in operators],
+        'query_nums': query_stats.index.to_numpy(),
+        'query_avgs': query_stats['rl_mean'].to_numpy(),
+        'query_rl_medians': query_stats['rl_median'].to_numpy(),
+        'query_duck_medians': query_stats['duck_median'].to_numpy(),
+        'operators': list(rl_op_stats.index),
+        'op_rl_medians': rl_op_stats['median'].to_numpy(),
+        'op_duck_medians': by_operator['duck_q_error'].median().to_numpy(),
+    }
+
+    if args.jobs == 1:
+        for plot, _ in PLOTS:
+            print(f"  ✓ Saved: {plot(plot_data)}")
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [executor.submit(plot, {key: plot_data[key] for key in keys})
+                       for plot, keys in PLOTS]
+            for future in futures:
+                print(f"  ✓ Saved: {future.result()}")
 
     print()
     print("=" * 80)
@@ -512,9 +803,9 @@ def main():
     print("  8. tpcds_smooth_comparison.png - Smooth curves (RL vs DuckDB)")
     print("  9. tpcds_rl_vs_duckdb_comparison.png - 4-panel comparison")
     print("\nKey insight:")
-    overall_improvement = ((np.median(duck_q_errors) - np.median(rl_q_errors)) / np.median(duck_q_errors)) * 100
+    overall_improvement = ((duck_median - rl_median) / duck_median) * 100
     print(f"  RL Model is {overall_improvement:.1f}% better than DuckDB baseline (median Q-error)")
-    print(f"  RL: {np.median(rl_q_errors):.2f} vs DuckDB: {np.median(duck_q_errors):.2f}")
+    print(f"  RL: {rl_median:.2f} vs DuckDB: {duck_median:.2f}")
 
     return 0
 
@@ -3,59 +3,65 @@
 Quick script to check if the XGBoost model is actually varying predictions.
 """
 
-import csv
-from collections import defaultdict
+import pandas as pd
 import sys
 
 # Read CSV
 try:
-    with open('qerror_results.csv', 'r') as f:
-        reader = csv.DictReader(f)
-        data = list(reader)
+    # Everything as text, empty fields as '' (like csv.DictReader), so counts parse exactly
+    df = pd.read_csv('qerror_results.csv', dtype=str, keep_default_na=False)
 except FileNotFoundError:
     print("Error: qerror_results.csv not found!")
     sys.exit(1)
+except pd.errors.EmptyDataError:
+    df = pd.DataFrame()
 
-if not data:
+if df.empty:
     print("Error: CSV file is empty!")
     sys.exit(1)
 
-print(f"Loaded {len(data)} rows from CSV")
-print(f"Columns: {list(data[0].keys())}")
+print(f"Loaded {len(df)} rows from CSV")
+print(f"Columns: {list(df.columns)}")
 print()
 
-# Group by operator
-by_operator = defaultdict(list)
-for row in data:
-    op = row['operator']
-    try:
-        pred = int(row['predicted'])
-        actual = int(row['actual'])
-        by_operator[op].append((pred, actual))
-    except (ValueError, KeyError) as e:
-        print(f"Error parsing row: {e}")
-        continue
-
-print("=== PREDICTION ANALYSIS ===\n")
+# Parse counts as integers, skipping rows that don't parse
+try:
+    preds = df['predicted'].str.strip()
+    actuals = df['actual'].str.strip()
+    operators = df['operator']
+except KeyError as e:
+    print(f"Error parsing rows: missing column {e}")
+    sys.exit(1)
+valid = preds.str.fullmatch(r'-?\d+') & actuals.str.fullmatch(r'-?\d+')
+for line in df.index[~valid] + 2:
+    print(f"Error parsing row: non-integer count on line {line}")
+df = pd.DataFrame({
+    'operator': operators[valid],
+    'predicted': preds[valid].astype('int64'),
+    'actual': actuals[valid].astype('int64'),
+})
 
-for op in sorted(by_operator.keys()):
-    preds = [p for p, a in by_operator[op]]
-    actuals = [a for p, a in by_operator[op]]
+# Group by operator; all per-operator counts come from one aggregation
+by_operator = df.groupby('operator', dropna=False)
+stats = by_operator.agg(
+    total=('predicted', 'size'),
+    unique_preds=('predicted', 'nunique'),
+    unique_actuals=('actual', 'nunique'),
+)
 
-    unique_preds = len(set(preds))
-    unique_actuals = len(set(actuals))
+print("=== PREDICTION ANALYSIS ===\n")
 
+for op, total, unique_preds, unique_actuals in stats.itertuples(name=None):
     print(f"{op}:")
-    print(f"  Total samples: {len(preds)}")
+    print(f"  Total samples: {total}")
     print(f"  Unique predictions: {unique_preds}")
     print(f"  Unique actuals: {unique_actuals}")
-    print(f"  Prediction variety: {unique_preds / len(preds) * 100:.1f}%")
+    print(f"  Prediction variety: {unique_preds / total * 100:.1f}%")
 
     if unique_preds <= 5:
-        pred_counts = {}
-        for p in preds:
-            pred_counts[p] = pred_counts.get(p, 0) + 1
+        # Ties keep first-seen order
+        pred_counts = by_operator['predicted'].get_group(op).value_counts(sort=False)
         print(f"  Most common predictions:")
-        for pred, count in sorted(pred_counts.items(), key=lambda x: -x[1])[:3]:
-            print(f"    {pred}: {count} times ({count/len(preds)*100:.1f}%)")
+        for pred, count in pred_counts.sort_values(ascending=False, kind='stable').head(3).items():
+            print(f"    {pred}: {count} times ({count/total*100:.1f}%)")
     print()
@@ -1,31 +1,55 @@
+import mmap
+import os
 import re
+import shutil
+import tempfile
 
-def fix_sql():
-    print("Reading queries_sf10.sql...")
-    with open('queries_sf10.sql', 'r') as f:
-        content = f.read()
-
-    print("Applying fixes...")
-    # Remove 'top X' (case insensitive)
-    # Note: We need to be careful not to match 'select top ...' if it's not there, but the regex handles it.
-    # We also want to keep the 'select' part.
-    # The previous regex replaced 'select top X ' with 'select '.
-    content = re.sub(r'(?i)select\s+top\s+\d+\s+', 'select ', content)
-
+# Every fix as one alternation, so the file is rewritten in a single pass
+FIX_RE = re.compile(
+    # Remove 'top X' (case insensitive), keeping the 'select' part
+    rb'(?P<top>(?i:select\s+top\s+\d+\s+))'
     # Replace '+/- X days' with '+/- INTERVAL 'X' DAY'
-    content = re.sub(r'([+-])\s+(\d+)\s+days', r"\1 INTERVAL '\2' DAY", content)
-
+    rb'|(?P<sign>[+-])\s+(?P<days>\d+)\s+days'
     # Quote 'at' alias to avoid syntax error
-    content = re.sub(r'\) at,', ') "at",', content)
-    
+    rb'|(?P<at>\) at,)'
     # Quote 'returns' alias to avoid syntax error
-    content = re.sub(r'\) returns', ') "returns"', content)
-    content = re.sub(r' as returns', ' as "returns"', content)
-    content = re.sub(r'coalesce\(returns, 0\) returns', 'coalesce(returns, 0) "returns"', content)
+    # (also covers 'coalesce(returns, 0) returns', whose tail is a ') returns')
+    rb'|(?P<returns>\) | as )returns'
+)
+
+def fix_match(m):
+    """Replacement text for one FIX_RE match."""
+    if m.group('top') is not None:
+        return b'select '
+    if m.group('sign') is not None:
+        return m.group('sign') + b" INTERVAL '" + m.group('days') + b"' DAY"
+    if m.group('at') is not None:
+        return b') "at",'
+    return m.group('returns') + b'"returns"'
+
+def fix_sql():
+    print("Reading queries_sf10.sql...")
+    # Map the file instead of reading it, and stream the fixed text to a temp file
+    # next to it; memory stays flat no matter how large the SQL dump is.
+    with open('queries_sf10.sql', 'rb') as f, \
+            tempfile.NamedTemporaryFile('wb', dir='.', delete=False) as out:
+        try:
+            print("Applying fixes...")
+            if os.fstat(f.fileno()).st_size:  # mmap rejects empty files
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    last = 0
+                    for m in FIX_RE.finditer(mm):
+                        out.write(mm[last:m.start()])
+                        out.write(fix_match(m))
+                        last = m.end()
+                    out.write(mm[last:])
+        except BaseException:
+            os.unlink(out.name)
+            raise
 
     print("Writing back to queries_sf10.sql...")
-    with open('queries_sf10.sql', 'w') as f:
-        f.write(content)
+    shutil.copymode('queries_sf10.sql', out.name)
+    os.replace(out.name, 'queries_sf10.sql')
     print("Done.")
 
 if __name__ == "__main__":
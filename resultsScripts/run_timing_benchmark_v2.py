@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Timing benchmark with single DuckDB session.
-Redirects output to file, times queries from Python.
+Redirects output to file, times queries with DuckDB's own .timer output.
 
 Usage:
     python3 run_timing_benchmark_v2.py --queries queries_sf5.sql --sf 5
@@ -12,19 +12,39 @@ import re
 import sys
 import csv
 import argparse
+import json
+import os
+import tempfile
 import time
 from datetime import datetime
 from pathlib import Path
 
+# SQL Server -> DuckDB rewrites, as one alternation so each query is scanned once:
+# "SELECT TOP N" -> "SELECT", trailing "LIMIT N" dropped, "+/- N day(s)" -> INTERVAL
+SQL_FIXUP_RE = re.compile(
+    r'(?P<top>\bselect\s+top\s+\d+\s+)'
+    r'|(?P<limit>\blimit\s+\d+\s*;?\s*$)'
+    r'|(?P<sign>[+-])\s*(?P<count>\d+)\s+(?P<unit>days?)\b',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+QUERY_MARKER_RE = re.compile(r'-- Query (\d+)/')
+# Query markers, and the line '.timer on' prints after every statement:
+# Run Time (s): real 0.123 user 0.456 sys 0.012
+TIMING_LOG_RE = re.compile(r'(START|END)_QUERY_(\d+)|Run Time \(s\): real ([\d.]+)|(Error:)')
+
+def sql_fixup(match):
+    """Replacement text for one SQL_FIXUP_RE match."""
+    if match.group('top') is not None:
+        return 'select '
+    if match.group('limit') is not None:
+        return ''
+    unit = 'days' if len(match.group('unit')) == 4 else 'day'
+    return f"{match.group('sign')} INTERVAL '{match.group('count')} {unit}'"
+
 def convert_sqlserver_to_duckdb(sql):
     """Convert SQL Server syntax to DuckDB syntax."""
-    sql_modified = re.sub(r'\bselect\s+top\s+\d+\s+', 'select ', sql, flags=re.IGNORECASE)
-    sql_modified = re.sub(r'\blimit\s+\d+\s*;?\s*$', '', sql_modified, flags=re.IGNORECASE | re.MULTILINE)
-    sql_modified = re.sub(r'\+\s*(\d+)\s+days\b', r"+ INTERVAL '\1 days'", sql_modified, flags=re.IGNORECASE)
-    sql_modified = re.sub(r'-\s*(\d+)\s+days\b', r"- INTERVAL '\1 days'", sql_modified, flags=re.IGNORECASE)
-    sql_modified = re.sub(r'\+\s*(\d+)\s+day\b', r"+ INTERVAL '\1 day'", sql_modified, flags=re.IGNORECASE)
-    sql_modified = re.sub(r'-\s*(\d+)\s+day\b', r"- INTERVAL '\1 day'", sql_modified, flags=re.IGNORECASE)
-    return sql_modified
+    return SQL_FIXUP_RE.sub(sql_fixup, sql)
 
 def parse_queries_file(filepath):
     """Parse queries.sql file into individual queries."""
@@ -34,25 +54,31 @@ def parse_queries_file(filepath):
 
     with open(filepath, 'r') as f:
         for line in f:
-            if line.startswith('-- Query '):
-                if current_query_num is not None and current_query_lines:
-                    sql = '\n'.join(current_query_lines)
-                    sql = convert_sqlserver_to_duckdb(sql)
-                    queries.append({'num': current_query_num, 'sql': sql})
-                    current_query_lines = []
-                match = re.search(r'-- Query (\d+)/', line)
-                if match:
-                    current_query_num = int(match.group(1))
-            elif line.startswith('-- start query') or line.startswith('-- end query'):
+            # Most lines are plain SQL; only comment lines need the marker checks
+            if line.startswith('-- '):
+                if line.startswith('Query ', 3):
+                    if current_query_num is not None and current_query_lines:
+                        sql = '\n'.join(current_query_lines)
+                        sql = convert_sqlserver_to_duckdb(sql)
+                        queries.append({'num': current_query_num, 'sql': sql})
+                        current_query_lines = []
+                    match = QUERY_MARKER_RE.search(line)
+                    if match:
+                        current_query_num = int(match.group(1))
+                    continue
+                if line.startswith(('start query', 'end query'), 3):
+                    continue
+
+            if current_query_num is None:
                 continue
             elif line.strip() == ';':
-                if current_query_num is not None and current_query_lines:
+                if current_query_lines:
                     sql = '\n'.join(current_query_lines)
                     sql = convert_sqlserver_to_duckdb(sql)
                     queries.append({'num': current_query_num, 'sql': sql})
                     current_query_lines = []
                     current_query_num = None
-            elif current_query_num is not None:
+            else:
                 current_query_lines.append(line.rstrip())
 
     if current_query_num is not None and current_query_lines:
@@ -62,6 +88,84 @@ def parse_queries_file(filepath):
 
     return queries
 
+def load_queries(filepath):
+    """Parse queries.sql, reusing <filepath>.v2.parsed.json from an earlier run.
+
+    The cache is keyed on the (st_mtime_ns, st_size) of the queries file and of this
+    script, and is only used when both match exactly.
+    """
+    cache_path = f"{filepath}.v2.parsed.json"
+    src = os.stat(filepath)
+    script = os.stat(__file__)
+    key = [src.st_mtime_ns, src.st_size, script.st_mtime_ns, script.st_size]
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+        if cache['key'] == key:
+            return [{'num': num, 'sql': sql} for num, sql in cache['queries']]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # No usable cache, parse the file
+
+    queries = parse_queries_file(filepath)
+
+    # Swap the cache in whole, so concurrent runs never load a partial file
+    try:
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(cache_path) or '.', delete=False) as f:
+            try:
+                json.dump({'key': key, 'queries': [[q['num'], q['sql']] for q in queries]}, f)
+            except BaseException:
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, cache_path)
+    except OSError:
+        pass  # Caching is best effort, e.g. in a read-only directory
+    return queries
+
+def parse_timing_log(lines):
+    """Extract per-query run times (seconds) from benchmark output lines.
+
+    With `.timer on` DuckDB prints `Run Time` lines even after a failed
+    statement, so failures are detected by their error line and skipped.
+    """
+    timings = {}
+    current_query = None
+    run_times = []
+    in_marker = marker_timed = failed = False
+
+    for line in lines:
+        match = TIMING_LOG_RE.search(line)
+        marker, num, seconds, error = match.groups() if match else (None,) * 4
+        if seconds is not None:
+            if in_marker:
+                # Timing of the START marker SELECT itself
+                marker_timed = True
+            elif current_query is not None:
+                run_times.append(float(seconds))
+            continue
+        if in_marker and marker_timed:
+            in_marker = False
+        if marker == 'START':
+            # Each marker shows up twice (column header and value)
+            if current_query != int(num):
+                current_query = int(num)
+                run_times = []
+                in_marker, marker_timed, failed = True, False, False
+        elif marker == 'END':
+            if current_query == int(num):
+                if run_times and not failed:
+                    timings[current_query] = sum(run_times)
+                current_query = None
+        elif error and current_query is not None:
+            failed = True
+
+    return timings
+
+def tee_lines(stream, log):
+    """Yield lines from stream, copying each one to log."""
+    for line in stream:
+        log.write(line)
+        yield line
+
 def main():
     parser = argparse.ArgumentParser(description='Time DuckDB queries in single session')
     parser.add_argument('--queries', default='queries_sf5.sql', help='Path to queries file')
@@ -74,30 +178,24 @@ def main():
 
     # Parse queries
     print(f"Parsing queries from {args.queries}...")
-    queries = parse_queries_file(args.queries)
+    queries = load_queries(args.queries)
     print(f"Found {len(queries)} queries")
 
     if args.limit:
         queries = queries[:args.limit]
         print(f"Limited to first {args.limit} queries")
 
-    # Prepare all queries in a single SQL script
+    # Prepare all queries in a single SQL script, streamed straight to disk
     print(f"\nPreparing benchmark script...")
 
-    sql_script = f"CALL dsdgen(sf={args.sf});\n"
-    sql_script += "SELECT 'DATA_LOADED';\n"
-
-    for query in queries:
-        # Add marker before query
-        sql_script += f"SELECT 'START_QUERY_{query['num']}';\n"
-        sql_script += query['sql'] + ";\n"
-        sql_script += f"SELECT 'END_QUERY_{query['num']}';\n"
+    with open('benchmark_script.sql', 'w') as f:
+        f.write(f".timer on\nCALL dsdgen(sf={args.sf});\nSELECT 'DATA_LOADED';\n")
 
-    sql_script += ".quit\n"
+        for query in queries:
+            # Wrap each query in start/end markers, one write per query
+            f.write(f"SELECT 'START_QUERY_{query['num']}';\n{query['sql']};\nSELECT 'END_QUERY_{query['num']}';\n")
 
-    # Write script to file for debugging
-    with open('benchmark_script.sql', 'w') as f:
-        f.write(sql_script)
+        f.write(".quit\n")
     print(f"Script written to benchmark_script.sql")
 
     # Open output file
@@ -110,52 +208,45 @@ def main():
 
     benchmark_start = time.time()
 
-    process = subprocess.Popen(
-        [args.duckdb, ':memory:'],
-        stdin=subprocess.PIPE,
-        stdout=output_log,
-        stderr=subprocess.STDOUT,
-        text=True
-    )
-
-    # Send entire script at once
-    process.stdin.write(sql_script)
-    process.stdin.close()
-
-    # Wait for completion
+    # DuckDB reads the script file itself, as fast as it consumes it
+    with open('benchmark_script.sql', 'r') as script:
+        process = subprocess.Popen(
+            [args.duckdb, ':memory:'],
+            stdin=script,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True
+        )
+
+    # Parse timings while the output is written to the log, instead of re-reading it after
     print("Waiting for benchmark to complete...")
+    timings = parse_timing_log(tee_lines(process.stdout, output_log))
     process.wait()
 
     benchmark_elapsed = time.time() - benchmark_start
     output_log.close()
 
     print(f"\nBenchmark completed in {benchmark_elapsed:.2f}s")
-    print("Parsing output log for timings...")
-
-    # Parse output log for timing markers
-    timings = {}
-    current_query = None
-    query_start = None
-
-    with open('benchmark_output.log', 'r') as f:
-        for line in f:
-            if 'START_QUERY_' in line:
-                match = re.search(r'START_QUERY_(\d+)', line)
-                if match:
-                    current_query = int(match.group(1))
-                    query_start = time.time()  # This won't work - we need timestamps from log
 
-    print("WARNING: Timing extraction from log not implemented")
-    print("Run completed, but individual query timings are approximate")
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['query_num', 'seconds'])
+        writer.writerows((q['num'], timings[q['num']]) for q in queries if q['num'] in timings)
+    print(f"Timings written to {args.output}")
 
     # Write summary
     print("\n" + "=" * 80)
     print("BENCHMARK SUMMARY")
     print("=" * 80)
     print(f"Total queries: {len(queries)}")
+    print(f"Timed queries: {len(timings)}")
     print(f"Total elapsed: {benchmark_elapsed:.2f}s")
-    print(f"Average time per query: {benchmark_elapsed / len(queries):.3f}s")
-    print(f"\nOutput log: benchmark_output.log")
+    if timings:
+        total_query_time = sum(timings.values())
+        print(f"Total query time: {total_query_time:.2f}s")
+        print(f"Average time per query: {total_query_time / len(timings):.3f}s")
+    print(f"\nTimings: {args.output}")
+    print(f"Output log: benchmark_output.log")
     print(f"Script: benchmark_script.sql")
 
     return 0
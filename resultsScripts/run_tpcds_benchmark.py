@@ -11,23 +11,52 @@ import re
 import sys
 import csv
 import argparse
+import functools
+import itertools
+import json
+import os
+import selectors
+import tempfile
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-import threading
-import queue
 import time
 import signal
 import random
 
-def percentile(values, p):
-    """Compute percentile with linear interpolation (numpy-like) for a list of floats."""
-    if not values:
+# RL log lines, matched against every line DuckDB prints
+# [RL TRAINING] OPERATOR_NAME: Actual=XXX, RLPred=YYY, DuckPred=ZZZ, RLQerr=A.AA, DuckQerr=B.BB
+TRAINING_RE = re.compile(r'\[RL TRAINING\] ([A-Z_]+(?:\s+[A-Z_]+)?)\s*:\s*Actual=(\d+),\s*RLPred=(\d+),\s*DuckPred=(\d+),\s*RLQerr=([\d.]+),\s*DuckQerr=([\d.]+)')
+# [RL BOOSTING] Incremental update #XXX: trained on YYY samples, total trees=ZZZ, avg Q-error=W.WWW
+UPDATE_RE = re.compile(r'\[RL BOOSTING\] Incremental update #(\d+): trained on (\d+) samples, total trees=(\d+), avg Q-error=([\d.]+)')
+
+# SQL Server -> DuckDB rewrites, as one alternation so each query is scanned once:
+# "SELECT TOP N" -> "SELECT", trailing "LIMIT N" dropped, "+/- N day(s)" -> INTERVAL
+SQL_FIXUP_RE = re.compile(
+    r'(?P<top>\bselect\s+top\s+\d+\s+)'
+    r'|(?P<limit>\blimit\s+\d+\s*;?\s*$)'
+    r'|(?P<sign>[+-])\s*(?P<count>\d+)\s+(?P<unit>days?)\b',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+QUERY_MARKER_RE = re.compile(r'-- Query (\d+)/')
+
+# Metric rows are written to the CSV (and flushed) in batches of this size
+CSV_BATCH_ROWS = 128
+
+def percentiles(values, ps):
+    """Compute several percentiles of a list of floats, sorting it only once."""
+    xs = sorted(values)
+    return [sorted_percentile(xs, p) for p in ps]
+
+def sorted_percentile(xs, p):
+    """Compute percentile with linear interpolation (numpy-like) for an already sorted list."""
+    if not xs:
         return None
     if p <= 0:
-        return min(values)
+        return xs[0]
     if p >= 100:
-        return max(values)
-    xs = sorted(values)
+        return xs[-1]
     k = (len(xs) - 1) * (p / 100.0)
     f = int(k)
     c = min(f + 1, len(xs) - 1)
@@ -39,120 +68,212 @@ def percentile(values, p):
 
 def parse_rl_line(line):
     """Parse a single line for RL training metrics."""
-    # NEW Pattern: [RL TRAINING] OPERATOR_NAME: Actual=XXX, RLPred=YYY, DuckPred=ZZZ, RLQerr=A.AA, DuckQerr=B.BB
-    training_pattern = r'\[RL TRAINING\] ([A-Z_]+(?:\s+[A-Z_]+)?)\s*:\s*Actual=(\d+),\s*RLPred=(\d+),\s*DuckPred=(\d+),\s*RLQerr=([\d.]+),\s*DuckQerr=([\d.]+)'
-    match = re.search(training_pattern, line)
+    # Most lines are query output; a substring check rejects them without the regex engine
+    if '[RL ' not in line:
+        return None
+
+    match = TRAINING_RE.search(line) if '[RL TRAINING]' in line else None
     if match:
+        # Unpack all fields in one call instead of a group() lookup each
+        operator, actual, rl_predicted, duck_predicted, rl_q_error, duck_q_error = match.groups()
         return {
             'type': 'metric',
-            'operator': match.group(1).strip(),
-            'actual': int(match.group(2)),
-            'rl_predicted': int(match.group(3)),
-            'duck_predicted': int(match.group(4)),
-            'rl_q_error': float(match.group(5)),
-            'duck_q_error': float(match.group(6))
+            'operator': operator.strip(),
+            'actual': int(actual),
+            'rl_predicted': int(rl_predicted),
+            'duck_predicted': int(duck_predicted),
+            'rl_q_error': float(rl_q_error),
+            'duck_q_error': float(duck_q_error)
         }
 
-    # Pattern: [RL BOOSTING] Incremental update #XXX: trained on YYY samples, total trees=ZZZ, avg Q-error=W.WWW
-    update_pattern = r'\[RL BOOSTING\] Incremental update #(\d+): trained on (\d+) samples, total trees=(\d+), avg Q-error=([\d.]+)'
-    match = re.search(update_pattern, line)
+    match = UPDATE_RE.search(line) if '[RL BOOSTING]' in line else None
     if match:
+        update_num, samples, trees, buffer_avg_q_error = match.groups()
         return {
             'type': 'update',
-            'update_num': int(match.group(1)),
-            'samples': int(match.group(2)),
-            'trees': int(match.group(3)),
-            'buffer_avg_q_error': float(match.group(4))
+            'update_num': int(update_num),
+            'samples': int(samples),
+            'trees': int(trees),
+            'buffer_avg_q_error': float(buffer_avg_q_error)
         }
 
     return None
 
-def stream_reader(stream, result_queue, label):
-    """Read stream line by line and put into queue."""
-    try:
-        for line in iter(stream.readline, ''):
-            if line:
-                result_queue.put((label, line))
-        stream.close()
-    except Exception as e:
-        result_queue.put(('error', str(e)))
-
+class OutputReader:
+    """Read lines from a pipe in the calling thread, waiting at most a timeout.
+
+    The pipe is polled with a selector and read in large blocks, so there is
+    no reader thread and no per-line queue hand-off.
+    """
+
+    def __init__(self, stream):
+        self.fd = stream.fileno()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.fd, selectors.EVENT_READ)
+        self.buffer = bytearray()
+        self.lines = deque()
+        self.eof = False
+
+    def get(self, timeout):
+        """Return the next line, or None if no full line arrives within timeout."""
+        if self.lines:  # Buffered lines need no clock reads
+            return self.lines.popleft()
+        deadline = time.monotonic() + timeout
+        while not self.lines:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self.eof:
+                # Nothing more will arrive
+                time.sleep(remaining)
+                return None
+            if self.selector.select(remaining):
+                self._read()
+        return self.lines.popleft()
+
+    def _read(self):
+        chunk = os.read(self.fd, 65536)
+        if not chunk:
+            self.eof = True
+            self.selector.unregister(self.fd)
+            if self.buffer:  # Unterminated last line
+                self.lines.append(self.buffer.decode('utf-8', errors='replace'))
+                self.buffer.clear()
+            return
+        self.buffer += chunk
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
+            return
+        # '\n' never occurs inside a multi-byte UTF-8 sequence, so decode all complete lines at once
+        text = self.buffer[:end].decode('utf-8', errors='replace')
+        del self.buffer[:end + 1]
+        self.lines.extend(line + '\n' for line in text.split('\n'))
+
+def sql_fixup(match):
+    """Replacement text for one SQL_FIXUP_RE match."""
+    if match.group('top') is not None:
+        return 'select '
+    if match.group('limit') is not None:
+        return ''
+    unit = 'days' if len(match.group('unit')) == 4 else 'day'
+    return f"{match.group('sign')} INTERVAL '{match.group('count')} {unit}'"
+
+# queries.sql repeats many generated queries verbatim (1355 distinct of 2000)
+@functools.lru_cache(maxsize=1024)
 def convert_sqlserver_to_duckdb(sql):
     """Convert SQL Server syntax to DuckDB syntax."""
-    # Remove "SELECT TOP N" -> "SELECT"
-    sql_modified = re.sub(r'\bselect\s+top\s+\d+\s+', 'select ', sql, flags=re.IGNORECASE)
-
-    # Remove any LIMIT clauses at the end
-    sql_modified = re.sub(r'\blimit\s+\d+\s*;?\s*$', '', sql_modified, flags=re.IGNORECASE | re.MULTILINE)
-
-    # Fix date arithmetic: "+ N days" -> "+ INTERVAL 'N days'"
-    # Pattern: (expression) + N days  or  (expression) - N days
-    sql_modified = re.sub(r'\+\s*(\d+)\s+days\b', r"+ INTERVAL '\1 days'", sql_modified, flags=re.IGNORECASE)
-    sql_modified = re.sub(r'-\s*(\d+)\s+days\b', r"- INTERVAL '\1 days'", sql_modified, flags=re.IGNORECASE)
+    return SQL_FIXUP_RE.sub(sql_fixup, sql)
 
-    # Also handle: + N day (singular)
-    sql_modified = re.sub(r'\+\s*(\d+)\s+day\b', r"+ INTERVAL '\1 day'", sql_modified, flags=re.IGNORECASE)
-    sql_modified = re.sub(r'-\s*(\d+)\s+day\b', r"- INTERVAL '\1 day'", sql_modified, flags=re.IGNORECASE)
+def make_query(num, lines):
+    """Build a query entry from its raw SQL lines."""
+    # Convert SQL Server syntax to DuckDB
+    return {'num': num, 'sql': convert_sqlserver_to_duckdb('\n'.join(lines))}
 
-    return sql_modified
-
-def parse_queries_file(filepath):
-    """Parse queries.sql file into individual queries."""
-    queries = []
+def iter_queries(filepath):
+    """Yield queries from a queries.sql file one at a time, in file order."""
     current_query_lines = []
     current_query_num = None
 
     with open(filepath, 'r') as f:
         for line in f:
-            # Check for query marker: -- Query X/TOTAL | Template: ...
-            if line.startswith('-- Query '):
-                # Save previous query if exists
-                if current_query_num is not None and current_query_lines:
-                    sql = '\n'.join(current_query_lines)
-                    # Convert SQL Server syntax to DuckDB
-                    sql = convert_sqlserver_to_duckdb(sql)
-                    queries.append({
-                        'num': current_query_num,
-                        'sql': sql
-                    })
-                    current_query_lines = []
+            # Most lines are plain SQL; only comment lines need the marker checks
+            if line.startswith('-- '):
+                # Check for query marker: -- Query X/TOTAL | Template: ...
+                if line.startswith('Query ', 3):
+                    # Emit previous query if exists
+                    if current_query_num is not None and current_query_lines:
+                        yield make_query(current_query_num, current_query_lines)
+                        current_query_lines = []
+
+                    # Extract query number
+                    match = QUERY_MARKER_RE.search(line)
+                    if match:
+                        current_query_num = int(match.group(1))
+                    continue
 
-                # Extract query number
-                match = re.search(r'-- Query (\d+)/', line)
-                if match:
-                    current_query_num = int(match.group(1))
+                # Skip comment lines and empty lines when building query
+                if line.startswith(('start query', 'end query'), 3):
+                    continue
 
-            # Skip comment lines and empty lines when building query
-            elif line.startswith('-- start query') or line.startswith('-- end query'):
+            if current_query_num is None:
                 continue
             elif line.strip() == ';':
                 # End of current query
-                if current_query_num is not None and current_query_lines:
-                    sql = '\n'.join(current_query_lines)
-                    # Convert SQL Server syntax to DuckDB
-                    sql = convert_sqlserver_to_duckdb(sql)
-                    queries.append({
-                        'num': current_query_num,
-                        'sql': sql
-                    })
+                if current_query_lines:
+                    yield make_query(current_query_num, current_query_lines)
                     current_query_lines = []
                     current_query_num = None
-            elif current_query_num is not None:
+            else:
                 # Part of the current query
                 current_query_lines.append(line.rstrip())
 
-    # Save last query if exists
+    # Emit last query if exists
     if current_query_num is not None and current_query_lines:
-        sql = '\n'.join(current_query_lines)
-        # Convert SQL Server syntax to DuckDB
-        sql = convert_sqlserver_to_duckdb(sql)
-        queries.append({
-            'num': current_query_num,
-            'sql': sql
-        })
+        yield make_query(current_query_num, current_query_lines)
+
+def query_cache_key(filepath):
+    """Identify the queries file and parser version a query cache was built from."""
+    src = os.stat(filepath)
+    script = os.stat(__file__)
+    return [src.st_mtime_ns, src.st_size, script.st_mtime_ns, script.st_size]
+
+def parse_queries_file(filepath):
+    """Parse queries.sql file into individual queries.
+
+    The converted queries are cached in <filepath>.parsed.json, which is reused only while
+    the queries file and this script have the same mtime and size as when it was written
+    (e.g. across tuner trials).
+    """
+    cache_path = f"{filepath}.parsed.json"
+    key = query_cache_key(filepath)
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+        if cache['key'] == key:
+            return [{'num': num, 'sql': sql} for num, sql in cache['queries']]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # No usable cache, parse the file
 
+    queries = list(iter_queries(filepath))
+
+    # Swap the cache in whole, so concurrent runs never load a partial file
+    try:
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(cache_path) or '.', delete=False) as f:
+            try:
+                json.dump({'key': key, 'queries': [[q['num'], q['sql']] for q in queries]}, f)
+            except BaseException:
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, cache_path)
+    except OSError:
+        pass  # Caching is best effort, e.g. in a read-only directory
     return queries
 
+def read_failed_queries(path):
+    """Read the failures recorded in a previous run's _failed.txt file."""
+    failures = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith('Query '):
+                failures.append({'query_num': int(line.split()[1]), 'error': ''})
+            elif line.startswith('Error: ') and failures:
+                failures[-1]['error'] = line[len('Error: '):].rstrip('\n')
+    return failures
+
+def completion_marker(query_num):
+    """Marker string DuckDB echoes back once a query has finished."""
+    return f"QUERY_COMPLETE_{query_num}"
+
+def send_query(process, query):
+    """Write a query followed by its completion marker to DuckDB's stdin.
+
+    Returns the (monotonic time, ISO timestamp) at which the query was sent.
+    """
+    sent = (time.monotonic(), datetime.now().isoformat())
+    process.stdin.write(f"{query['sql']};\nSELECT '{completion_marker(query['num'])}';\n".encode())
+    process.stdin.flush()
+    return sent
+
 def main():
     parser = argparse.ArgumentParser(description='Run DuckDB TPC-DS benchmark and extract Q-error metrics')
     parser.add_argument('--queries', default='queries.sql', help='Path to TPC-DS queries file')
@@ -165,13 +286,23 @@ def main():
     parser.add_argument('--limit', type=int, help='Limit number of queries to run')
     parser.add_argument('--resume', action='store_true', help='Resume from existing CSV file')
     parser.add_argument('--clean', action='store_true', help='Start fresh (delete existing output)')
+    parser.add_argument('--skip-failed', action='store_true',
+                        help="With --resume, also skip queries listed in the previous run's _failed.txt")
     parser.add_argument('--shuffle', action='store_true', help='Randomize query execution order')
+    parser.add_argument('--pipeline-depth', type=int, default=4,
+                        help='Number of queries queued in DuckDB ahead of the one being read (default: 4)')
 
     args = parser.parse_args()
+    if args.pipeline_depth < 1:
+        parser.error('--pipeline-depth must be at least 1')
+    if args.skip_failed and not args.resume:
+        parser.error('--skip-failed requires --resume')
 
     # Handle clean vs resume
-    if args.clean and Path(args.output).exists():
+    output_exists = Path(args.output).exists()
+    if args.clean and output_exists:
         Path(args.output).unlink()
+        output_exists = False
         print(f"Deleted existing {args.output}")
 
     # Parse queries
@@ -183,6 +314,22 @@ def main():
         queries = queries[:args.limit]
         print(f"Limited to first {args.limit} queries")
 
+    # Check if resuming; drop already processed queries up front
+    if args.resume and output_exists:
+        with open(args.output, 'r') as f:
+            processed_queries = {int(row['query_num']) for row in csv.DictReader(f)}
+        print(f"Resuming: {len(processed_queries)} queries already processed")
+        queries = [q for q in queries if q['num'] not in processed_queries]
+
+    # Known failures stay skipped, and stay listed in the failed file
+    failed_file = args.output.replace('.csv', '_failed.txt')
+    known_failures = []
+    if args.resume and args.skip_failed and Path(failed_file).exists():
+        known_failures = read_failed_queries(failed_file)
+        known_failed_nums = {failure['query_num'] for failure in known_failures}
+        print(f"Skipping {len(known_failed_nums)} previously failed queries")
+        queries = [q for q in queries if q['num'] not in known_failed_nums]
+
     # Shuffle queries if requested
     if args.shuffle:
         random.shuffle(queries)
@@ -191,48 +338,34 @@ def main():
         preview = [q['num'] for q in queries[:10]]
         print(f"First 10 queries after shuffle: {preview}")
 
-    # Check if resuming
-    processed_queries = set()
-    if args.resume and Path(args.output).exists():
-        with open(args.output, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                processed_queries.add(int(row['query_num']))
-        print(f"Resuming: {len(processed_queries)} queries already processed")
-
     # Open CSV file for writing
     csv_file = open(args.output, 'a' if args.resume else 'w', newline='')
-    csv_writer = csv.DictWriter(csv_file, fieldnames=[
-        'query_num', 'operator', 'actual', 'rl_predicted', 'duck_predicted',
-        'rl_q_error', 'duck_q_error', 'trees', 'timestamp'
-    ])
-
-    if not args.resume or not Path(args.output).exists():
-        csv_writer.writeheader()
+    csv_writer = csv.writer(csv_file)
+
+    if not args.resume or not output_exists:
+        # Rows are written as tuples in this column order
+        csv_writer.writerow([
+            'query_num', 'operator', 'actual', 'rl_predicted', 'duck_predicted',
+            'rl_q_error', 'duck_q_error', 'trees', 'timestamp'
+        ])
         csv_file.flush()
 
-    # Start DuckDB process with pipes
+    # Start DuckDB process with binary pipes (OutputReader decodes output in bulk)
     print(f"\nStarting DuckDB process: {args.duckdb} {args.db}")
     process = subprocess.Popen(
         [args.duckdb, args.db],
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1  # Line buffered
+        stderr=subprocess.STDOUT,  # One pipe keeps errors in order with the query output
     )
 
     print(f"DuckDB process started (PID: {process.pid})")
 
-    # Create queue for threaded output reading
-    output_queue = queue.Queue()
+    # Read output lines as they become ready
+    output_reader = OutputReader(process.stdout)
 
-    # Start threads to read stdout and stderr
-    stdout_thread = threading.Thread(target=stream_reader, args=(process.stdout, output_queue, 'stdout'), daemon=True)
-    stderr_thread = threading.Thread(target=stream_reader, args=(process.stderr, output_queue, 'stderr'), daemon=True)
-
-    stdout_thread.start()
-    stderr_thread.start()
+    # Metric rows not yet written to the CSV
+    pending_rows = []
 
     try:
         if not args.skip_load:
@@ -243,24 +376,23 @@ def main():
 CALL dsdgen(sf={args.sf});
 SELECT 'TPC-DS data loaded successfully';
 """
-            process.stdin.write(init_sql)
+            process.stdin.write(init_sql.encode())
             process.stdin.flush()
 
             # Wait for initialization to complete (look for success message)
-            init_timeout = time.time() + 300  # 5 minute timeout for data generation
+            init_timeout = time.monotonic() + 300  # 5 minute timeout for data generation
             init_complete = False
 
-            while time.time() < init_timeout:
-                try:
-                    label, line = output_queue.get(timeout=1)
-                    if 'TPC-DS data loaded successfully' in line:
-                        init_complete = True
-                        print("TPC-DS initialization complete!")
-                        break
-                    elif 'Error' in line or 'error' in line:
-                        print(f"[ERROR] {line.strip()}")
-                except queue.Empty:
+            while time.monotonic() < init_timeout:
+                line = output_reader.get(timeout=1)
+                if line is None:
                     continue
+                if 'TPC-DS data loaded successfully' in line:
+                    init_complete = True
+                    print("TPC-DS initialization complete!")
+                    break
+                elif 'Error' in line or 'error' in line:
+                    print(f"[ERROR] {line.strip()}")
 
             if not init_complete:
                 print("ERROR: TPC-DS initialization timed out or failed")
@@ -275,43 +407,57 @@ SELECT 'TPC-DS data loaded successfully';
 
         metrics_count = 0
         trees_count = 0
-        last_progress_time = time.time()
         failed_queries = []  # Track failed queries
         rl_q_errors = []
         duck_q_errors = []
 
-        for i, query in enumerate(queries, 1):
+        # Keep up to --pipeline-depth queries queued in DuckDB, so it can start on the
+        # next one while this side is still parsing output. Output belongs to the
+        # oldest query in flight until that query's completion marker comes back.
+        to_run = enumerate(queries, 1)
+        in_flight = deque()
+        for i, query in itertools.islice(to_run, args.pipeline_depth):
+            in_flight.append((i, query) + send_query(process, query))
+
+        while in_flight:
+            # Times are taken when the query was sent, not when its output is reached
+            i, query, query_start, query_ts = in_flight[0]
             query_num = query['num']
-
-            # Skip if already processed (resume mode)
-            if query_num in processed_queries:
-                print(f"Skipping query {query_num} (already processed)")
-                continue
-
             print(f"\n[{i}/{len(queries)}] Running Query {query_num}...")
-
-            # Send query to DuckDB with completion marker
-            query_marker = f"QUERY_COMPLETE_{query_num}"
-            process.stdin.write(query['sql'] + ';\n')
-            process.stdin.write(f"SELECT '{query_marker}';\n")
-            process.stdin.flush()
+            query_marker = completion_marker(query_num)
 
             # Process output until query completes
-            query_start = time.time()
             query_complete = False
             query_had_error = False
-            last_activity = time.time()
+            stall_deadline = time.monotonic() + 30
 
             while True:
-                try:
-                    label, line = output_queue.get(timeout=1.0)
-                    last_activity = time.time()
+                line = output_reader.get(timeout=1.0)
+                if line is None:
+                    # Check if process is still alive
+                    if process.poll() is not None:
+                        print("ERROR: DuckDB process terminated unexpectedly")
+                        break
 
-                    # Check for completion marker
-                    if query_marker in line:
-                        query_complete = True
+                    # Check for timeout (30 seconds of no activity)
+                    if time.monotonic() > stall_deadline:
+                        print(f"  WARNING: No activity for 30 seconds, assuming query stuck")
                         break
 
+                    continue
+
+                stall_deadline = time.monotonic() + 30
+
+                # Check for completion marker
+                if query_marker in line:
+                    query_complete = True
+                    break
+
+                # Parse for RL metrics; only other lines can be DuckDB errors, so the
+                # (far more frequent) metric lines skip the error scan
+                parsed = parse_rl_line(line)
+
+                if parsed is None:
                     # Check for errors
                     if 'Error:' in line or 'ERROR:' in line:
                         print(f"  ERROR in query: {line.strip()}")
@@ -320,51 +466,46 @@ SELECT 'TPC-DS data loaded successfully';
                         failed_queries.append({'query_num': query_num, 'error': line.strip()})
                         break
 
-                    # Parse for RL metrics
-                    parsed = parse_rl_line(line)
-
-                    if parsed and parsed['type'] == 'metric':
-                        # Write metric to CSV immediately
-                        csv_writer.writerow({
-                            'query_num': query_num,
-                            'operator': parsed['operator'],
-                            'actual': parsed['actual'],
-                            'rl_predicted': parsed['rl_predicted'],
-                            'duck_predicted': parsed['duck_predicted'],
-                            'rl_q_error': parsed['rl_q_error'],
-                            'duck_q_error': parsed['duck_q_error'],
-                            'trees': trees_count,
-                            'timestamp': datetime.now().isoformat()
-                        })
+                elif parsed['type'] == 'metric':
+                    # Buffer the metric; it reaches the CSV with its batch
+                    pending_rows.append((
+                        query_num,
+                        parsed['operator'],
+                        parsed['actual'],
+                        parsed['rl_predicted'],
+                        parsed['duck_predicted'],
+                        parsed['rl_q_error'],
+                        parsed['duck_q_error'],
+                        trees_count,
+                        query_ts,
+                    ))
+                    if len(pending_rows) >= CSV_BATCH_ROWS:
+                        csv_writer.writerows(pending_rows)
                         csv_file.flush()
-                        metrics_count += 1
-                        rl_q_errors.append(parsed['rl_q_error'])
-                        duck_q_errors.append(parsed['duck_q_error'])
-
-                        # Progress update every 50 metrics
-                        if metrics_count % 50 == 0:
-                            elapsed = time.time() - last_progress_time
-                            print(f"  Progress: {metrics_count} metrics, {trees_count} trees")
-                            last_progress_time = time.time()
-
-                    elif parsed and parsed['type'] == 'update':
-                        trees_count = parsed['trees']
-                        print(f"  [TRAINING UPDATE] Trees: {trees_count}, Samples: {parsed['samples']}, Avg Q-error: {parsed['buffer_avg_q_error']:.2f}")
-
-                except queue.Empty:
-                    # Check if process is still alive
-                    if process.poll() is not None:
-                        print("ERROR: DuckDB process terminated unexpectedly")
-                        break
-
-                    # Check for timeout (30 seconds of no activity)
-                    if time.time() - last_activity > 30:
-                        print(f"  WARNING: No activity for 30 seconds, assuming query stuck")
-                        break
-
-                    continue
-
-            elapsed = time.time() - query_start
+                        pending_rows.clear()
+                    metrics_count += 1
+                    rl_q_errors.append(parsed['rl_q_error'])
+                    duck_q_errors.append(parsed['duck_q_error'])
+
+                    # Progress update every 50 metrics
+                    if metrics_count % 50 == 0:
+                        print(f"  Progress: {metrics_count} metrics, {trees_count} trees")
+
+                elif parsed['type'] == 'update':
+                    trees_count = parsed['trees']
+                    print(f"  [TRAINING UPDATE] Trees: {trees_count}, Samples: {parsed['samples']}, Avg Q-error: {parsed['buffer_avg_q_error']:.2f}")
+
+            # Persist the query's remaining metrics before moving on
+            csv_writer.writerows(pending_rows)
+            csv_file.flush()
+            pending_rows.clear()
+
+            # Top the pipeline back up
+            in_flight.popleft()
+            for i, query in itertools.islice(to_run, 1):
+                in_flight.append((i, query) + send_query(process, query))
+
+            elapsed = time.monotonic() - query_start
             print(f"  Completed in {elapsed:.2f}s (Metrics: {metrics_count}, Trees: {trees_count})")
 
         print("\n" + "=" * 80)
@@ -378,12 +519,8 @@ SELECT 'TPC-DS data loaded successfully';
 
         # Summary stats for Q-error distributions
         if metrics_count > 0:
-            rl_med = percentile(rl_q_errors, 50)
-            rl_p90 = percentile(rl_q_errors, 90)
-            rl_p95 = percentile(rl_q_errors, 95)
-            duck_med = percentile(duck_q_errors, 50)
-            duck_p90 = percentile(duck_q_errors, 90)
-            duck_p95 = percentile(duck_q_errors, 95)
+            rl_med, rl_p90, rl_p95 = percentiles(rl_q_errors, (50, 90, 95))
+            duck_med, duck_p90, duck_p95 = percentiles(duck_q_errors, (50, 90, 95))
 
             print("\nQ-error summary (per-operator metrics)")
             print("-" * 80)
@@ -398,11 +535,10 @@ SELECT 'TPC-DS data loaded successfully';
                 print(f"  ... and {len(failed_queries) - 10} more")
 
             # Save failed queries to file
-            failed_file = args.output.replace('.csv', '_failed.txt')
             with open(failed_file, 'w') as f:
                 f.write("Failed Queries Summary\n")
                 f.write("=" * 80 + "\n\n")
-                for failure in failed_queries:
+                for failure in known_failures + failed_queries:
                     f.write(f"Query {failure['query_num']}\n")
                     f.write(f"Error: {failure['error']}\n\n")
             print(f"\nFailed queries details saved to: {failed_file}")
@@ -413,13 +549,14 @@ SELECT 'TPC-DS data loaded successfully';
     finally:
         # Clean up
         try:
-            process.stdin.write('.quit\n')
+            process.stdin.write(b'.quit\n')
             process.stdin.flush()
         except:
             pass
 
         process.terminate()
         process.wait(timeout=5)
+        csv_writer.writerows(pending_rows)
         csv_file.close()
 
         print(f"CSV file saved: {args.output}")
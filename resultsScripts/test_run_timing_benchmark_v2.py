@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for timing extraction in run_timing_benchmark_v2.py.
+
+Usage:
+    python3 -m unittest test_run_timing_benchmark_v2
+"""
+
+import unittest
+
+from run_timing_benchmark_v2 import parse_timing_log
+
+
+def marker(name):
+    """DuckDB's box output for SELECT 'name'; with .timer on."""
+    width = len(name) + 4
+    return [
+        '┌' + '─' * width + '┐',
+        f"│ '{name}' │",
+        '│' + 'varchar'.center(width) + '│',
+        '├' + '─' * width + '┤',
+        f'│ {name}   │',
+        '└' + '─' * width + '┘',
+        'Run Time (s): real 0.000 user 0.000042 sys 0.000003',
+    ]
+
+
+# Lines taken from benchmark_sf5_opt_v2.log; DuckDB prints two Run Time
+# lines per query, and still prints them after a failed statement
+LOG = (
+    marker('START_QUERY_3')
+    + [
+        '┌────────┬──────────┬───────────────────────┬───────────────┐',
+        '│ d_year │ brand_id │         brand         │    sum_agg    │',
+        '│ int64  │  int64   │        varchar        │ decimal(38,2) │',
+        '├────────┼──────────┼───────────────────────┼───────────────┤',
+        '│   1998 │  1001001 │ amalgamalg #1         │     197460.18 │',
+        '└────────┴──────────┴───────────────────────┴───────────────┘',
+        'Run Time (s): real 0.055 user 0.108173 sys 0.032949',
+        'Run Time (s): real 0.000 user 0.000013 sys 0.000000',
+    ]
+    + marker('END_QUERY_3')
+    + marker('START_QUERY_58')
+    + [
+        'Binder Error: Ambiguous reference to column name "item_id" '
+        '(use: "ss_items.item_id" or "cs_items.item_id")',
+        'Run Time (s): real 0.001 user 0.000648 sys 0.000142',
+        'Run Time (s): real 0.000 user 0.000005 sys 0.000000',
+    ]
+    + marker('END_QUERY_58')
+)
+
+
+class ParseTimingLogTest(unittest.TestCase):
+    def test_success_is_timed(self):
+        timings = parse_timing_log(line + '\n' for line in LOG)
+        self.assertAlmostEqual(timings[3], 0.055)
+
+    def test_failure_is_skipped(self):
+        timings = parse_timing_log(line + '\n' for line in LOG)
+        self.assertNotIn(58, timings)
+        self.assertEqual(list(timings), [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
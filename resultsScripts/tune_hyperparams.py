@@ -9,6 +9,9 @@ Key design points:
 - Each trial is a separate process => fresh RLBoostingModel instance.
 - Supports `--skip-load` to reuse an existing TPC-DS database (fast).
 - Writes a results CSV you can resume from.
+- `--parallel N` runs N trials at once, each against its own (temporary) copy of the DB file;
+  it needs `--skip-load` and free space in --outdir for N copies of the database.
+- queries.sql is parsed once up front; trials load the benchmark's parsed-query cache.
 
 Example:
   # First create/load a persistent DB once (slow, done once):
@@ -20,17 +23,30 @@ Example:
 
 import argparse
 import csv
+import itertools
 import json
 import math
 import os
+import queue
 import random
 import re
+import shutil
 import subprocess
 import sys
+import tempfile
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from run_tpcds_benchmark import parse_queries_file
+
+try:
+    import orjson
+except ImportError:  # Optional: only used to speed up params_json decoding
+    orjson = None
 
 
 SUMMARY_RE = re.compile(
@@ -103,11 +119,24 @@ def sample_params(rng: random.Random) -> Dict[str, str]:
     }
 
 
+def params_to_json(params: Dict[str, str]) -> str:
+    # Always the stdlib encoder: orjson has no ", "/": " separators, and params_json
+    # must keep the format of results CSVs written before so resumed rows compare equal
+    return json.dumps(params, sort_keys=True)
+
+
+def params_from_json(text: str) -> Dict[str, str]:
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
 def run_trial(
     trial_idx: int,
     params: Dict[str, str],
     args: argparse.Namespace,
     output_dir: Path,
+    db: Optional[str] = None,
 ) -> Tuple[int, Optional[TrialResult], str]:
     trial_csv = output_dir / f"trial_{trial_idx:04d}.csv"
     cmd = [
@@ -116,7 +145,7 @@ def run_trial(
         "--duckdb",
         args.duckdb,
         "--db",
-        args.db,
+        db or args.db,
         "--sf",
         str(args.sf),
         "--queries",
@@ -149,6 +178,82 @@ def run_trial(
     return proc.returncode, result, stdout
 
 
+def worker_dbs(args: argparse.Namespace, db_dir: Path) -> "queue.Queue[str]":
+    # DuckDB takes an exclusive lock on its database file, so concurrent trials
+    # each need their own file: copy the loaded DB into db_dir once per worker slot.
+    dbs: "queue.Queue[str]" = queue.Queue()
+    if args.parallel == 1 or args.db == ":memory:":
+        for _ in range(args.parallel):
+            dbs.put(args.db)
+        return dbs
+    src = Path(args.db)
+    wal = src.with_name(src.name + ".wal")
+    for k in range(args.parallel):
+        db = db_dir / f"worker{k}_{src.name}"
+        shutil.copyfile(src, db)
+        # Changes not yet checkpointed live in the WAL; DuckDB replays it on open
+        if wal.exists():
+            shutil.copyfile(wal, db.with_name(db.name + ".wal"))
+        dbs.put(str(db))
+    return dbs
+
+
+def run_pooled_trial(
+    trial_idx: int,
+    params: Dict[str, str],
+    args: argparse.Namespace,
+    output_dir: Path,
+    dbs: "queue.Queue[str]",
+) -> Tuple[int, Optional[TrialResult], str]:
+    # Borrow a free database for the duration of the trial
+    db = dbs.get()
+    try:
+        return run_trial(trial_idx, params, args, output_dir, db)
+    finally:
+        dbs.put(db)
+
+
+def run_trials(
+    trials: Iterable[Tuple[int, Dict[str, str]]],
+    args: argparse.Namespace,
+    output_dir: Path,
+    dbs: "queue.Queue[str]",
+) -> Iterator[Tuple[int, Dict[str, str], int, Optional[TrialResult], str]]:
+    # Yields (trial_idx, params, returncode, result, stdout) as each trial finishes.
+    if args.parallel == 1:
+        for i, params in trials:
+            yield (i, params) + run_trial(i, params, args, output_dir)
+        return
+
+    # Submit lazily, keeping at most --parallel trials in flight, so an interrupt
+    # only has to wait for the trials that are actually running.
+    trials = iter(trials)
+    ex = ThreadPoolExecutor(max_workers=args.parallel)
+    try:
+        pending = {}
+        for i, params in itertools.islice(trials, args.parallel):
+            pending[ex.submit(run_pooled_trial, i, params, args, output_dir, dbs)] = (i, params)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, params = pending.pop(fut)
+                for j, next_params in itertools.islice(trials, 1):
+                    pending[ex.submit(run_pooled_trial, j, next_params, args, output_dir, dbs)] = (j, next_params)
+                yield (i, params) + fut.result()
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def prepare_queries(args: argparse.Namespace) -> None:
+    # The RL settings are env vars read at DuckDB startup, so every trial needs its own
+    # process. What can be shared is query parsing: build the benchmark's parsed-query
+    # cache once here, so trials load it instead of each parsing queries.sql.
+    bench = Path(args.benchmark_script).resolve()
+    if bench != Path(__file__).resolve().with_name("run_tpcds_benchmark.py"):
+        return  # A custom benchmark script reads the queries file its own way
+    parse_queries_file(args.queries)
+
+
 def load_existing_results(path: Path):
     if not path.exists():
         return []
@@ -174,14 +279,29 @@ def main() -> int:
     p.add_argument("--benchmark-script", default="run_tpcds_benchmark.py", help="Path to benchmark runner script")
     p.add_argument("--outdir", default="tuning_runs", help="Directory to store trial CSVs + results log")
     p.add_argument("--resume", action="store_true", help="Resume: append to existing results CSV")
+    p.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of trials to run concurrently (with N > 1 and a file --db, needs --skip-load "
+        "and room in --outdir for N full copies of the DB)",
+    )
     args = p.parse_args()
+    if args.parallel < 1:
+        p.error("--parallel must be at least 1")
+    if args.parallel > 1 and args.db != ":memory:" and not args.skip_load:
+        # Concurrent trials run against copies of --db, so it has to be loaded already
+        p.error("--parallel > 1 requires --skip-load (load --db once first)")
 
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
     results_csv = outdir / "tuning_results.csv"
 
+    prepare_queries(args)
+
     existing = load_existing_results(results_csv) if args.resume else []
-    start_idx = len(existing)
+    # Parallel trials finish (and are recorded) out of order, so continue after the highest id
+    start_idx = max((int(r["trial"]) for r in existing), default=-1) + 1
 
     seed = args.seed if args.seed != 0 else int(time.time())
     rng = random.Random(seed)
@@ -207,54 +327,57 @@ def main() -> int:
         for row in existing:
             try:
                 tr = TrialResult(float(row["rl_median"]), float(row["rl_p90"]), float(row["rl_p95"]))
-                params = json.loads(row["params_json"])
+                params = params_from_json(row["params_json"])
                 if best is None or tr.score_tuple() < best[0].score_tuple():
                     best = (tr, params)
             except Exception:
                 continue
 
-        for i in range(start_idx, start_idx + args.trials):
-            params = sample_params(rng)
-            rc, res, stdout = run_trial(i, params, args, outdir)
+        # Trials are independent processes; run up to --parallel at once and record
+        # each as it finishes. Params are drawn in trial order, so a seed gives the same trials.
+        # Per-worker DB copies live in a temporary directory that is removed afterwards.
+        trials = ((i, sample_params(rng)) for i in range(start_idx, start_idx + args.trials))
+        with tempfile.TemporaryDirectory(dir=outdir, prefix="worker_dbs_") as db_dir:
+            dbs = worker_dbs(args, Path(db_dir))
+            for i, params, rc, res, stdout in run_trials(trials, args, outdir, dbs):
+                if res is None:
+                    # Save full output for debugging
+                    (outdir / f"trial_{i:04d}.log").write_text(stdout)
+                    w.writerow(
+                        {
+                            "trial": i,
+                            "returncode": rc,
+                            "rl_median": "",
+                            "rl_p90": "",
+                            "rl_p95": "",
+                            "params_json": params_to_json(params),
+                        }
+                    )
+                    f.flush()
+                    print(f"[{i}] FAILED to parse summary (rc={rc}). Saved log to {outdir}/trial_{i:04d}.log")
+                    continue
 
-            if res is None:
-                # Save full output for debugging
-                (outdir / f"trial_{i:04d}.log").write_text(stdout)
                 w.writerow(
                     {
                         "trial": i,
                         "returncode": rc,
-                        "rl_median": "",
-                        "rl_p90": "",
-                        "rl_p95": "",
-                        "params_json": json.dumps(params, sort_keys=True),
+                        "rl_median": f"{res.median:.6f}",
+                        "rl_p90": f"{res.p90:.6f}",
+                        "rl_p95": f"{res.p95:.6f}",
+                        "params_json": params_to_json(params),
                     }
                 )
                 f.flush()
-                print(f"[{i}] FAILED to parse summary (rc={rc}). Saved log to {outdir}/trial_{i:04d}.log")
-                continue
-
-            w.writerow(
-                {
-                    "trial": i,
-                    "returncode": rc,
-                    "rl_median": f"{res.median:.6f}",
-                    "rl_p90": f"{res.p90:.6f}",
-                    "rl_p95": f"{res.p95:.6f}",
-                    "params_json": json.dumps(params, sort_keys=True),
-                }
-            )
-            f.flush()
 
-            improved = best is None or res.score_tuple() < best[0].score_tuple()
-            if improved:
-                best = (res, params)
-                (outdir / "best_params.json").write_text(json.dumps(params, indent=2, sort_keys=True))
+                improved = best is None or res.score_tuple() < best[0].score_tuple()
+                if improved:
+                    best = (res, params)
+                    (outdir / "best_params.json").write_text(json.dumps(params, indent=2, sort_keys=True))
 
-            tag = "BEST" if improved else "ok"
-            print(
-                f"[{i}] {tag}  RL median={res.median:.2f} p90={res.p90:.2f} p95={res.p95:.2f}  params={params}"
-            )
+                tag = "BEST" if improved else "ok"
+                print(
+                    f"[{i}] {tag}  RL median={res.median:.2f} p90={res.p90:.2f} p95={res.p95:.2f}  params={params}"
+                )
 
     if best is not None:
         res, params = best